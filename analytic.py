@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""事件驱动的解析模拟：不逐帧推进，而是直接算出下一个事件发生的帧。
+
+两次跳跃之间小鸟走的是抛物线：经过 k 帧后
+
+    v(k) = v0 + k * GRAVITY
+    y(k) = y0 + k * v0 + GRAVITY * k * (k + 1) / 2
+
+GRAVITY (0.25) 与 BIRD_JUMP (-7) 在二进制下都能精确表示，坐标和速度始终是 1/4 的
+整数倍且远小于 2**50，所以闭式公式与 update_bird 逐帧累加的浮点结果逐位相同。
+第 j 根管道的生成帧由赛道 (course.Course) 给出，管道匀速移动，与小鸟横向重叠的帧区间
+以及计分帧都是相对生成帧的常数偏移。于是每一段抛物线只需要求解几次二次方程：
+
+- 触顶：y(k) < 0 的第一帧（该帧 y 被夹到 0，速度清零，从这里开始新的一段）；
+- 落地：y(k) >= SCREEN_HEIGHT - 小鸟高度 的第一帧；
+- 撞管：管道横向重叠的帧区间内 y(k) < 上管道高度 或 y(k) >= 下管道顶部 - 小鸟高度 + 1 的第一帧；
+- 计分：不需要模拟，到第 T 帧为止通过的管道数可在生成帧列表上二分查找得到。
+
+每段只和常数根管道有关，计算量与跳跃次数成正比，而与帧数无关。
+
+命令行用法::
+
+    python analytic.py verify --episodes 2000     # 与逐帧模拟逐局对比，证明结果逐帧一致
+    python analytic.py verify --difficulty ramp   # 在随得分变化的难度曲线下对比
+    python analytic.py bench                      # 比较两种模拟的速度
+"""
+import argparse
+import math
+import random
+import sys
+import time
+
+from course import CURVES, DEFAULT_DIFFICULTY, Course
+from game_logic import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, GRAVITY, BIRD_JUMP, PIPE_SPEED, PIPE_WIDTH,
+    MIN_PIPE_INTERVAL_TICKS, PIPE_LIFETIME_TICKS, DEATH_GROUND, DEATH_PIPE,
+    create_bird, rects_overlap
+)
+
+_BIRD = create_bird()
+GROUND_Y = SCREEN_HEIGHT - _BIRD.height  # 小鸟 y 达到该值即落地
+
+# 管道在生成后第 d 帧（生成当帧 d = 0）参与碰撞检测时的横坐标为 SCREEN_WIDTH - PIPE_SPEED * d，
+# 检测之后才移动；下面用与 update_world 相同的规则算出横向重叠的 d 区间和计分的 d
+_OVERLAP = [d for d in range(PIPE_LIFETIME_TICKS + 1)
+            if rects_overlap(_BIRD.x, 0, _BIRD.width, 1, SCREEN_WIDTH - PIPE_SPEED * d, 0, PIPE_WIDTH, 1)]
+DANGER_FIRST, DANGER_LAST = _OVERLAP[0], _OVERLAP[-1]
+SCORE_DELAY = next(d for d in range(PIPE_LIFETIME_TICKS + 1)
+                   if _BIRD.x + _BIRD.width // 2 > SCREEN_WIDTH - PIPE_SPEED * (d + 1) + PIPE_WIDTH)
+assert _OVERLAP == list(range(DANGER_FIRST, DANGER_LAST + 1))
+assert DANGER_LAST - DANGER_FIRST < MIN_PIPE_INTERVAL_TICKS  # 同一帧最多与一根管道横向重叠
+
+_A = GRAVITY / 2  # y(k) = _A * k**2 + (v0 + _A) * k + y0
+
+
+def height_after(y0, v0, k):
+    """从 (y0, v0) 出发、未触顶时第 k 帧后的高度，与逐帧累加结果逐位相同"""
+    return y0 + k * v0 + GRAVITY * (k * (k + 1) // 2)
+
+
+def first_at_least(y0, v0, c, lo, hi):
+    """[lo, hi] 中第一个满足 y(k) >= c 的 k，没有时返回 None"""
+    if lo > hi:
+        return None
+    if height_after(y0, v0, lo) >= c:
+        return lo
+    # y(lo) < c 且 y 是开口向上的抛物线，答案是较大根之后的第一个整数
+    b = v0 + _A
+    root = (-b + math.sqrt(b * b - 4 * _A * (y0 - c))) / (2 * _A)
+    k = max(lo, math.ceil(root))
+    while k > lo and height_after(y0, v0, k - 1) >= c:  # 修正开方的舍入误差
+        k -= 1
+    while height_after(y0, v0, k) < c:
+        k += 1
+    return k if k <= hi else None
+
+
+def first_below(y0, v0, c, lo, hi):
+    """[lo, hi] 中第一个满足 y(k) < c 的 k，没有时返回 None"""
+    if lo > hi:
+        return None
+    if height_after(y0, v0, lo) < c:
+        return lo
+    b = v0 + _A
+    disc = b * b - 4 * _A * (y0 - c)
+    if disc <= 0:
+        return None
+    # y(k) < c 的整数在两根之间；y(lo) >= c，答案只可能是较小根之后的第一个整数
+    k0 = math.floor((-b - math.sqrt(disc)) / (2 * _A)) + 1
+    for k in (k0 - 1, k0, k0 + 1):  # 修正开方的舍入误差
+        if lo <= k <= hi and height_after(y0, v0, k) < c:
+            return k
+    return None
+
+
+def _pipes_in_danger(course, t_lo, t_hi):
+    """在 [t_lo, t_hi] 内与小鸟横向重叠过的管道序号"""
+    return range(course.count_until(t_lo - DANGER_LAST - 1), course.count_until(t_hi - DANGER_FIRST))
+
+
+def _scored_before(course, tick):
+    """第 tick 帧之前（不含）已经计分的管道数"""
+    return course.count_until(tick - 1 - SCORE_DELAY)
+
+
+def _hits(y, top, bottom):
+    """小鸟在高度 y 时是否与横向重叠的管道相撞（与 pipe_collide 相同的取整规则）"""
+    by = int(y)
+    return (rects_overlap(0, by, 1, _BIRD.height, 0, 0, 1, top) or
+            rects_overlap(0, by, 1, _BIRD.height, 0, bottom, 1, SCREEN_HEIGHT - bottom))
+
+
+def _outcome(tick, y, course, cause):
+    """第 tick 帧结束（死亡或到达帧数上限）时的得分"""
+    score = _scored_before(course, tick)
+    if course.count_until(tick - SCORE_DELAY) > score:
+        # 本帧正好经过第 score 根管道：撞上它时不计分
+        top, bottom, _ = course.pipe(score)
+        if not _hits(y, top, bottom):
+            score += 1
+    return score, tick, cause
+
+
+def simulate(seed, flaps, max_ticks, difficulty=DEFAULT_DIFFICULTY):
+    """解析地模拟一局，返回 (得分, 结束帧, 死亡原因)；到 max_ticks 仍存活时原因为 None
+
+    flaps 为升序、不重复的跳跃帧号，含义与录像相同：在世界从第 t 帧推进到第 t+1 帧之前跳跃。
+    结果与 replay.simulate 的逐帧模拟完全一致。
+    """
+    course = Course(seed, difficulty)
+    tick = 0
+    y = SCREEN_HEIGHT // 2
+    v = 0
+    next_flap = 0
+    while True:
+        if next_flap < len(flaps) and flaps[next_flap] == tick:
+            v = BIRD_JUMP
+            next_flap += 1
+        seg_end = flaps[next_flap] if next_flap < len(flaps) else max_ticks
+        span = min(seg_end, max_ticks) - tick
+        if span <= 0:
+            return _outcome(tick, y, course, None)
+
+        # 触顶的帧：该帧 y 被夹到 0，之前的帧都在同一条抛物线上
+        clamp = first_below(y, v, 0, 1, span)
+        free = clamp - 1 if clamp is not None else span
+
+        # 在抛物线部分找最早的死亡帧：先算落地，只有落地之前的管道需要检查（同一帧落地优先）
+        death_k, cause = first_at_least(y, v, GROUND_Y, 1, free), DEATH_GROUND
+        last = free if death_k is None else death_k - 1
+        for j in _pipes_in_danger(course, tick + 1, tick + last):
+            s = course.spawn_tick(j)
+            lo = max(1, s + DANGER_FIRST - tick)
+            hi = min(last, s + DANGER_LAST - tick)
+            if death_k is not None:
+                hi = min(hi, death_k - 1)
+            top, bottom, _ = course.pipe(j)
+            for k in (first_below(y, v, top, lo, hi),
+                      first_at_least(y, v, bottom - _BIRD.height + 1, lo, hi)):
+                if k is not None and (death_k is None or k < death_k):
+                    death_k, cause = k, DEATH_PIPE
+        if death_k is not None:
+            return _outcome(tick + death_k, height_after(y, v, death_k), course, cause)
+
+        if clamp is not None:
+            # 触顶帧 y = 0，只可能撞上管道的上半段
+            tick += clamp
+            y, v = 0, 0
+            if len(_pipes_in_danger(course, tick, tick)):
+                return _outcome(tick, y, course, DEATH_PIPE)
+            continue
+
+        y, v = height_after(y, v, span), v + span * GRAVITY
+        tick += span
+
+
+# --- 与逐帧模拟的对照 ---
+
+def _discrete(seed, flaps, max_ticks, difficulty=DEFAULT_DIFFICULTY):
+    from replay import Replay, simulate as replay_simulate
+    return replay_simulate(Replay(seed, flaps, 0, 0, difficulty), max_ticks=max_ticks)
+
+
+def _follow_gap_flaps(seed, max_ticks, skill, difficulty=DEFAULT_DIFFICULTY):
+    """用跟随缺口策略（以概率 skill 执行）玩一局，返回跳跃帧号列表"""
+    from env import FlappyEnv
+    from rollout import follow_gap_policy
+    rng = random.Random(seed ^ 0x5EED)
+    env = FlappyEnv(difficulty=difficulty)
+    state = env.reset(seed)
+    flaps = []
+    while state.tick < max_ticks:
+        tick = state.tick
+        flap = follow_gap_policy(state) if rng.random() < skill else rng.random() < 0.05
+        if flap:
+            flaps.append(tick)
+        state, _, done = env.step(flap)
+        if done:
+            break
+    return flaps
+
+
+def _random_schedule(rng, max_ticks):
+    """随机的跳跃序列：固定间隔、随机间隔、连续跳跃（触顶）等"""
+    kind = rng.randrange(3)
+    if kind == 0:
+        period = rng.randint(15, 45)
+        return list(range(rng.randrange(period), max_ticks, period))
+    if kind == 1:
+        flaps, tick = [], rng.randrange(30)
+        while tick < max_ticks:
+            flaps.append(tick)
+            tick += rng.randint(1, 60)
+        return flaps
+    start = rng.randrange(100)
+    return list(range(start, start + rng.randint(1, 40)))
+
+
+def verify(episodes, seed=0, max_ticks=20000, difficulty=DEFAULT_DIFFICULTY):
+    """在多种跳跃序列上对比解析模拟与逐帧模拟，返回不一致的 (种子, 解析结果, 逐帧结果) 列表"""
+    rng = random.Random(seed)
+    mismatches = []
+    for i in range(episodes):
+        game_seed = rng.getrandbits(64)
+        if i % 2 == 0:
+            flaps = _follow_gap_flaps(game_seed, max_ticks, rng.choice((0.9, 0.99, 1.0)), difficulty)
+            if flaps and rng.random() < 0.5:
+                del flaps[rng.randrange(len(flaps)):]  # 截断后的序列让小鸟在不同位置死亡
+        else:
+            flaps = _random_schedule(rng, max_ticks)
+        limit = rng.choice((max_ticks, rng.randint(1, 2000)))
+        expected = _discrete(game_seed, flaps, limit, difficulty)
+        actual = simulate(game_seed, flaps, limit, difficulty)
+        if actual != expected:
+            mismatches.append((game_seed, actual, expected))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析模拟")
+    sub = parser.add_subparsers(dest='command', required=True)
+    check = sub.add_parser('verify', help="与逐帧模拟对比")
+    check.add_argument('--episodes', type=int, default=2000)
+    check.add_argument('--seed', type=int, default=0)
+    bench = sub.add_parser('bench', help="比较两种模拟的速度")
+    bench.add_argument('--episodes', type=int, default=50)
+    for command in (check, bench):
+        command.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY, help="难度曲线")
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        start = time.perf_counter()
+        mismatches = verify(args.episodes, args.seed, difficulty=args.difficulty)
+        for game_seed, actual, expected in mismatches[:20]:
+            print(f"不一致: 种子 {game_seed} 解析 {actual} 逐帧 {expected}")
+        print(f"对比 {args.episodes} 局，不一致 {len(mismatches)} 局，用时 {time.perf_counter() - start:.2f} 秒")
+        sys.exit(1 if mismatches else 0)
+
+    max_ticks = 100000
+    schedules = [(seed, _follow_gap_flaps(seed, max_ticks, 1.0, args.difficulty)) for seed in range(args.episodes)]
+    timings = {}
+    for name, func in (('逐帧', _discrete), ('解析', simulate)):
+        start = time.perf_counter()
+        results = [func(seed, flaps, max_ticks, args.difficulty) for seed, flaps in schedules]
+        timings[name] = time.perf_counter() - start
+        print(f"{name}: {timings[name]:.3f} 秒")
+    total_ticks = sum(tick for _, tick, _ in results)
+    total_flaps = sum(len(flaps) for _, flaps in schedules)
+    print(f"共 {total_ticks} 帧、{total_flaps} 次跳跃，解析模拟快 {timings['逐帧'] / timings['解析']:.1f} 倍")
+
+if __name__ == "__main__":
+    main()
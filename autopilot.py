@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""自动驾驶：用游戏自身的物理规则向前搜索，决定每一帧是否跳跃。
+
+搜索从当前帧开始，对每一帧分别尝试"跳/不跳"，直到小鸟越过所有已经出现的管道
+（再留出一小段余量）。还没有生成的管道缺口未知，不参与搜索，与玩家看到的信息相同。
+
+- 置换表：以 (y, 速度, 各管道危险区间相对当前帧的偏移和缺口, 距搜索终点的帧数) 为键
+  记录该状态能否存活。坐标和速度都是 1/4 的整数倍，按 1/4 量化即可精确表示，
+  键中只有相对时间，因此后续帧可以复用之前的搜索结果。置换表分新旧两代：新一代写满后
+  整体变为旧一代，旧一代中命中的状态搬回新一代。每代较小，dict 扩容很快；被淘汰的一代
+  由之后的决策分批释放，不会在某一帧里一次释放几万个状态；
+- 时间预算：窗口游戏每个渲染帧调用 start_frame()，这一帧里追赶的所有逻辑帧共用一个截止时间，
+  超时的决策中止搜索，按置换表中已有的结论选择动作，没有结论时退回跟随缺口策略；
+  已经完成的子搜索仍留在置换表中，下一帧继续利用；
+- 两个动作中先尝试跟随缺口策略给出的动作，通常第一条路径就能存活。
+
+命令行用法（无界面统计得分分布，不设时间预算，结果可复现）::
+
+    python autopilot.py --episodes 200 --seed 0 --workers 4
+"""
+import argparse
+import json
+import time
+
+from game_logic import (
+    SCREEN_HEIGHT, GRAVITY, BIRD_JUMP, PIPE_SPEED, rects_overlap
+)
+from analytic import height_after, first_below
+from course import CURVES, DEFAULT_DIFFICULTY
+from rollout import follow_gap_policy, run_rollouts
+
+TABLE_SIZE = 40000       # 置换表最多保存的状态数（新旧两代各一半）
+FRAME_BUDGET_MS = 2.0     # 窗口中每个渲染帧用于搜索的时间预算
+SEARCH_MARGIN_TICKS = 30  # 越过最后一根已知管道后再搜索的帧数
+EMPTY_HORIZON_TICKS = 60  # 没有已知管道时的搜索帧数
+BUDGET_CHECK_INTERVAL = 8  # 每展开多少个状态检查一次时间（每个状态约几微秒）
+RELEASE_PER_DECISION = 256  # 每次决策释放的已淘汰状态数
+DEFAULT_MAX_TICKS = 20000
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Autopilot:
+    """基于记忆化搜索的自动驾驶"""
+
+    def __init__(self, budget_ms=FRAME_BUDGET_MS, table_size=TABLE_SIZE):
+        self.budget_ms = budget_ms  # 每帧的时间预算，None 表示不限时间
+        self.table_size = table_size
+        self.table = {}       # 新一代
+        self._old = {}        # 旧一代
+        self._released = []   # 已淘汰、等待分批释放的旧一代
+        self.nodes = 0      # 累计展开的状态数
+        self.hits = 0       # 置换表命中次数
+        self.timeouts = 0   # 超出时间预算的决策次数
+        self._target = 0
+        self._deadline = None
+        self._frame_deadline = None
+
+    def _windows(self, world):
+        """已知管道的危险区间：[(第一帧, 最后一帧, 上管道高度, 下管道顶部), ...]，帧号相对当前帧
+
+        第 k 帧（k >= 1）检测碰撞时管道的横坐标为 pipe.x - PIPE_SPEED * (k - 1)。
+        """
+        bird = world.bird
+        windows = []
+        for pipe in world.pipes:
+            first = last = None
+            k = 1
+            while pipe.x - PIPE_SPEED * (k - 1) + pipe.width > bird.x:
+                if rects_overlap(bird.x, 0, bird.width, 1, pipe.x - PIPE_SPEED * (k - 1), 0, pipe.width, 1):
+                    if first is None:
+                        first = k
+                    last = k
+                k += 1
+            if first is not None:
+                windows.append((first, last, pipe.top_height, pipe.bottom_y))
+        return windows
+
+    def _can_reach(self, y, v, t, windows, bird_height):
+        """剪枝：小鸟能否在之后每个危险区间的第一帧进入缺口
+
+        一直不跳时每一帧的 y 都是所有跳法中最大的，每帧都跳时最小，
+        两者之间不包含缺口时这一状态必死。
+        """
+        for first, last, top, bottom in windows:
+            if last <= t:
+                continue
+            n = max(first, t + 1) - t
+            lowest = max(0, y + n * (BIRD_JUMP + GRAVITY))
+            if lowest >= bottom - bird_height + 1:
+                return False  # 一直跳也升不到缺口
+            clamp = first_below(y, v, 0, 1, n) if v < 0 else None
+            if clamp is None:
+                highest = height_after(y, v, n)
+            else:
+                highest = height_after(0, 0, n - clamp)  # 先撞到顶部，速度归零后再下落
+            if highest < top:
+                return False  # 一直不跳也落不到缺口
+        return True
+
+    def _step(self, y, v, flap, k, windows, bird_height, ground):
+        """推进一帧到第 k 帧，返回新的 (y, v)，死亡时返回 None
+
+        与 update_bird 和 pipe_collide 相同的运算顺序和取整方式，结果逐位一致。
+        """
+        v = (BIRD_JUMP if flap else v) + GRAVITY
+        y += v
+        if y < 0:
+            y = 0
+            v = 0
+        if y + bird_height >= ground:
+            return None
+        for first, last, top, bottom in windows:
+            if first <= k <= last:
+                if int(y) < top or int(y) + bird_height > bottom:
+                    return None
+                break
+        return y, v
+
+    @staticmethod
+    def _key(y, v, t, windows, horizon):
+        """置换表的键：只含相对第 t 帧的时间
+
+        展开成只含数字的一层元组，垃圾回收第一次扫描时就不再跟踪，不会堆积到最老一代拖慢完整回收。
+        """
+        key = [y, v, horizon - t]
+        for first, last, top, bottom in windows:
+            if last > t:
+                key += (first - t, last - t, top, bottom)
+        return tuple(key)
+
+    def _safe(self, y, v, t, windows, horizon, bird_height, ground):
+        """从第 t 帧的状态 (y, v) 出发，是否存在存活到 horizon 帧的跳跃序列"""
+        if t >= horizon:
+            return True
+        key = self._key(y, v, t, windows, horizon)
+        result = self._lookup(key)
+        if result is not None:
+            self.hits += 1
+            return result
+
+        self.nodes += 1
+        if self._deadline is not None and self.nodes % BUDGET_CHECK_INTERVAL == 0:
+            if time.perf_counter() > self._deadline:
+                raise _OutOfTime
+
+        result = False
+        # 上升或高于目标时先尝试不跳，否则先尝试跳
+        actions = (False, True) if v < 0 or y < self._target else (True, False)
+        for flap in actions if self._can_reach(y, v, t, windows, bird_height) else ():
+            state = self._step(y, v, flap, t + 1, windows, bird_height, ground)
+            if state is not None and self._safe(*state, t + 1, windows, horizon, bird_height, ground):
+                result = True
+                break
+
+        self._remember(key, result)
+        return result
+
+    def _lookup(self, key):
+        """置换表中的结论，没有时返回 None；旧一代命中的状态搬回新一代"""
+        result = self.table.get(key)
+        if result is None:
+            result = self._old.get(key)
+            if result is not None:
+                self._remember(key, result)
+        return result
+
+    def _remember(self, key, result):
+        table = self.table
+        table[key] = result
+        if len(table) >= self.table_size // 2:
+            self._released.append(self._old)
+            self._old, self.table = table, {}
+
+    def _release(self):
+        """释放一部分已淘汰的状态"""
+        released = self._released
+        for _ in range(RELEASE_PER_DECISION):
+            if not released:
+                return
+            if released[-1]:
+                released[-1].popitem()
+            else:
+                released.pop()
+
+    def start_frame(self):
+        """开始一个渲染帧：到下一次调用为止的所有决策共用 budget_ms 的时间预算"""
+        if self.budget_ms is not None:
+            self._frame_deadline = time.perf_counter() + self.budget_ms / 1000
+
+    def decide(self, world):
+        """返回本帧是否跳跃（在 update_world 之前调用）"""
+        bird = world.bird
+        windows = self._windows(world)
+        horizon = windows[-1][1] + SEARCH_MARGIN_TICKS if windows else EMPTY_HORIZON_TICKS
+        # 目标高度与跟随缺口策略一致，决定搜索中先尝试哪个动作
+        self._target = windows[0][3] - 45 if windows else 350
+        self._deadline = self._frame_deadline
+        self._release()
+
+        preferred = follow_gap_policy(world)
+        states = [(flap, self._step(bird.y, bird.velocity, flap, 1, windows, bird.height, SCREEN_HEIGHT))
+                  for flap in (preferred, not preferred)]
+        try:
+            if self._deadline is not None and time.perf_counter() > self._deadline:
+                raise _OutOfTime
+            for flap, state in states:
+                if state is not None and self._safe(*state, 1, windows, horizon, bird.height, SCREEN_HEIGHT):
+                    return flap
+        except _OutOfTime:
+            self.timeouts += 1
+            # 本帧的预算已用完：按置换表中已有的结论选择，先选已知能存活的，再避开已知必死的
+            known = []
+            for flap, state in states:
+                result = False if state is None else self._lookup(self._key(*state, 1, windows, horizon))
+                known.append((flap, result))
+            for flap, result in known:
+                if result:
+                    return flap
+            for flap, result in known:
+                if result is None:
+                    return flap
+        return preferred
+
+
+_autopilot = None
+
+
+def autopilot_policy(state):
+    """供 rollout.run_rollouts 使用的策略（每个进程一个不限时间的 Autopilot）"""
+    global _autopilot
+    if _autopilot is None:
+        _autopilot = Autopilot(budget_ms=None)
+    return _autopilot.decide(state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无界面评估自动驾驶的得分分布")
+    parser.add_argument('--episodes', type=int, default=200, help="回合数")
+    parser.add_argument('--seed', type=int, default=0, help="主种子")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认使用全部 CPU")
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS, help="单局帧数上限")
+    parser.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY, help="难度曲线")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = run_rollouts(args.episodes, args.seed, policy=autopilot_policy, workers=args.workers,
+                         max_ticks=args.max_ticks, difficulty=args.difficulty)
+    stats['elapsed_seconds'] = time.perf_counter() - start
+    print(json.dumps(stats, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""NumPy 向量化的批量游戏环境：一次推进成千上万局游戏。
+
+所有小鸟和管道都保存在结构化数组 (struct-of-arrays) 中，重力、顶部限制、
+管道滚动、计分和碰撞检测对全部世界一次性完成。规则与 game_logic.update_world
+逐帧一致：第 i 个世界与 FlappyEnv(seeds[i], difficulty) 在相同操作下得到完全相同的结果，
+结束的世界会原地自动开始下一局（随机数序列继续，等价于 FlappyEnv.reset()）。
+
+赛道与 course.Course 相同：每个世界按批预先抽取原始缺口中心，出管时再按难度曲线的
+查表结果和上一根缺口中心向量化地映射（course.gap_center），一局结束时丢弃没用完的一批。
+"""
+import random
+
+import numpy as np
+
+from course import (
+    COURSE_BATCH, DEFAULT_DIFFICULTY, GAP_MARGIN, RAW_CENTER_MIN, RAW_CENTER_MAX, get_curve
+)
+from game_logic import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, GRAVITY, BIRD_JUMP, PIPE_SPEED, PIPE_WIDTH,
+    FIRST_PIPE_DELAY_TICKS, create_bird
+)
+
+_BIRD = create_bird()
+BIRD_X = _BIRD.x
+BIRD_WIDTH = _BIRD.width
+BIRD_HEIGHT = _BIRD.height
+BIRD_CENTER_X = BIRD_X + BIRD_WIDTH // 2
+
+# 空槽位的管道 x 坐标：x <= -PIPE_WIDTH 的管道视为已移除
+EMPTY_PIPE_X = -PIPE_WIDTH
+# 管道移动后右边缘刚越过小鸟中心时计分，等价于 x 落在 [SCORE_X, SCORE_X + PIPE_SPEED) 内
+SCORE_X = BIRD_CENTER_X - PIPE_WIDTH - PIPE_SPEED
+
+
+class BatchFlappyEnv:
+    """N 个世界并行推进的批量环境"""
+
+    def __init__(self, num_envs, seed=None, seeds=None, difficulty=DEFAULT_DIFFICULTY, max_pipes=None):
+        """seeds 为每个世界单独的种子；只给 seed 时第 i 个世界使用 seed + i
+
+        max_pipes 默认取难度曲线下同时存在的最多管道数。
+        """
+        if seeds is None:
+            seeds = [None if seed is None else seed + i for i in range(num_envs)]
+        if len(seeds) != num_envs:
+            raise ValueError("seeds 的长度必须等于 num_envs")
+        curve = get_curve(difficulty)
+        if max_pipes is None:
+            max_pipes = curve.max_pipes
+        self.num_envs = num_envs
+        self.max_pipes = max_pipes
+        self.difficulty = difficulty
+        self.rngs = [random.Random(s) for s in seeds]
+        # 难度曲线的查表结果，管道序号超出表长时取最后一项
+        self._curve_gap, self._curve_interval, self._curve_shift = (
+            np.array(column, dtype=np.int64) for column in zip(*curve.table))
+
+        n, k = num_envs, max_pipes
+        self.bird_y = np.zeros(n, dtype=np.float64)
+        self.bird_velocity = np.zeros(n, dtype=np.float64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.next_pipe = np.zeros(n, dtype=np.int64)
+        # 管道数组按 (槽位, 世界) 排列，逐槽位的运算在内存中连续
+        self.pipe_x = np.zeros((k, n), dtype=np.int32)
+        self.pipe_top = np.zeros((k, n), dtype=np.int32)
+        self.pipe_bottom = np.zeros((k, n), dtype=np.int32)
+        # 小鸟顶部 y 相对上管道的可活动范围：0 <= y - top <= span 时不会撞管
+        self.pipe_span = np.zeros((k, n), dtype=np.uint32)
+        # 最近一次结束时的分数，仅对本帧 done 的世界有意义
+        self.final_score = np.zeros(n, dtype=np.int64)
+        self.episodes = np.zeros(n, dtype=np.int64)
+
+        # 每个世界按各自的随机数序列预先抽好的原始缺口中心，用到时才按批抽取
+        self._raw_center = np.zeros((n, COURSE_BATCH), dtype=np.int64)
+        self._raw_cursor = np.full(n, COURSE_BATCH, dtype=np.int64)
+        self._pipe_index = np.zeros(n, dtype=np.int64)   # 本局下一根管道的序号
+        self._last_center = np.zeros(n, dtype=np.int64)  # 上一根管道的缺口中心
+        self.reset()
+
+    @property
+    def state(self):
+        """当前状态的数组视图（pipe_alive 除外均不复制）"""
+        return {
+            'bird_y': self.bird_y,
+            'bird_velocity': self.bird_velocity,
+            'score': self.score,
+            'tick': self.tick,
+            'pipe_x': self.pipe_x,
+            'pipe_top': self.pipe_top,
+            'pipe_bottom': self.pipe_bottom,
+            'pipe_alive': self.pipe_x > EMPTY_PIPE_X,
+        }
+
+    def reset(self, mask=None):
+        """重置全部世界，或仅重置 mask 为 True 的世界"""
+        if mask is None:
+            mask = slice(None)
+        self.bird_y[mask] = _BIRD.y
+        self.bird_velocity[mask] = _BIRD.velocity
+        self.score[mask] = 0
+        self.tick[mask] = 0
+        self.next_pipe[mask] = FIRST_PIPE_DELAY_TICKS
+        self.pipe_x[:, mask] = EMPTY_PIPE_X
+        # 与 Course.reset() 相同：新的一局从新的一批随机数开始
+        self._raw_cursor[mask] = COURSE_BATCH
+        self._pipe_index[mask] = 0
+        return self.state
+
+    def _refill_raw(self, worlds):
+        """为指定世界抽取下一批原始缺口中心，与 Course._extend 消耗随机数的方式相同"""
+        for w in worlds.tolist():
+            randint = self.rngs[w].randint
+            self._raw_center[w] = [randint(RAW_CENTER_MIN, RAW_CENTER_MAX) for _ in range(COURSE_BATCH)]
+        self._raw_cursor[worlds] = 0
+
+    def _spawn_pipes(self, worlds):
+        """为需要出管的世界各生成一根管道"""
+        exhausted = worlds[self._raw_cursor[worlds] == COURSE_BATCH]
+        if exhausted.size:
+            self._refill_raw(exhausted)
+        slots = np.argmin(self.pipe_x[:, worlds], axis=0)
+        if (self.pipe_x[slots, worlds] > EMPTY_PIPE_X).any():
+            raise RuntimeError("管道数量超过 max_pipes")
+        cursor = self._raw_cursor[worlds]
+        raw = self._raw_center[worlds, cursor]
+        self._raw_cursor[worlds] = cursor + 1
+
+        # 向量化的 course.gap_center：按难度曲线查表，再映射到允许的范围
+        index = self._pipe_index[worlds]
+        level = np.minimum(index, len(self._curve_gap) - 1)
+        gap = self._curve_gap[level]
+        shift = self._curve_shift[level]
+        lo = gap // 2 + GAP_MARGIN
+        hi = SCREEN_HEIGHT - GAP_MARGIN - (gap - gap // 2)
+        previous = self._last_center[worlds]
+        follow = index > 0  # 第一根管道不受上一根的限制
+        lo, hi = (np.where(follow, np.maximum(lo, np.minimum(previous - shift, hi)), lo),
+                  np.where(follow, np.minimum(hi, np.maximum(previous + shift, lo)), hi))
+        center = lo + (raw - RAW_CENTER_MIN) * (hi - lo) // (RAW_CENTER_MAX - RAW_CENTER_MIN)
+        top = center - gap // 2
+        bottom = top + gap
+        self._last_center[worlds] = center
+        self._pipe_index[worlds] = index + 1
+
+        self.pipe_x[slots, worlds] = SCREEN_WIDTH
+        self.pipe_top[slots, worlds] = top
+        self.pipe_bottom[slots, worlds] = bottom
+        self.pipe_span[slots, worlds] = bottom - BIRD_HEIGHT - top
+        self.next_pipe[worlds] = self.tick[worlds] + self._curve_interval[level]
+
+    def step(self, flaps):
+        """所有世界推进一帧，返回 (state, rewards, dones)；done 的世界已自动重置"""
+        y, v = self.bird_y, self.bird_velocity
+
+        # 跳跃与重力
+        np.putmask(v, np.asarray(flaps, dtype=bool), BIRD_JUMP)
+        v += GRAVITY
+        y += v
+        # 防止飞出顶部
+        ceiling = y < 0
+        np.copyto(y, 0, where=ceiling)
+        np.copyto(v, 0, where=ceiling)
+
+        # 落地检测
+        dones = y >= SCREEN_HEIGHT - BIRD_HEIGHT
+
+        # 按帧计数生成管道
+        self.tick += 1
+        spawn = np.flatnonzero(self.tick == self.next_pipe)
+        if spawn.size:
+            self._spawn_pipes(spawn)
+
+        # 碰撞检测（在管道移动之前，小鸟坐标按 pygame.Rect 的方式截断为整数）
+        # 两个区间判断都用无符号比较合并成一次：x 方向重叠 / y 方向落在缺口之外
+        px = self.pipe_x
+        by = y.astype(np.int32)
+        overlap_x = (px - (BIRD_X - PIPE_WIDTH + 1)).view(np.uint32) < PIPE_WIDTH + BIRD_WIDTH - 1
+        outside_gap = (by - self.pipe_top).view(np.uint32) > self.pipe_span
+        hit = overlap_x & outside_gap
+        dones |= hit.any(axis=0)
+
+        # 管道前移并计分；碰撞的管道不计分（该世界随后会被重置，位置无需保留）
+        px -= PIPE_SPEED
+        scored = (px - SCORE_X).view(np.uint32) < PIPE_SPEED
+        scored &= ~hit
+        # 同一世界的管道出现时间互不相同，每帧至多一根管道计分
+        rewards = scored.any(axis=0).view(np.int8)
+        self.score += rewards
+
+        # 移除离开屏幕的管道
+        np.maximum(px, EMPTY_PIPE_X, out=px)
+
+        # 结束的世界原地开始下一局
+        if dones.any():
+            self.final_score[dones] = self.score[dones]
+            self.episodes += dones
+            self.reset(dones)
+        return self.state, rewards, dones
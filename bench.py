@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""性能基准：物理、碰撞、渲染、文字和持久化的热点路径。
+
+使用 SDL 的 dummy 视频驱动，不会打开窗口，可以在 CI 或服务器上运行。
+结果写成 JSON，可与保存的基线比较，便于对比解释器、Nuitka 编译版等不同构建。
+
+命令行用法::
+
+    python bench.py --out bench.json                      # 运行全部基准
+    python bench.py --filter render --quick               # 只运行名字包含 render 的基准，缩短时间
+    python bench.py --baseline base.json --max-regression 0.2   # 与基线比较，变慢超过 20% 时返回 1
+    python bench.py --results bench.json --baseline base.json   # 只比较已有的结果，不重新运行
+"""
+import os
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import pygame
+
+from game_logic import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_SPEED, create_bird, create_pipe, create_world, update_bird, update_pipe,
+    update_world, pipe_collide, reset_world
+)
+from course import COURSE_BATCH, Course
+from leaderboard import LeaderboardStore
+from persistence import write_atomic
+from render import SKY_BLUE, WHITE, SurfaceCache, SpriteCache, draw_world
+
+REPEAT = 5  # 每个基准重复的轮数，取最快的一轮
+RENDER_PIPE_COUNTS = (0, 1, 2, 4, 8)
+LEADERBOARD_SIZES = (100, 10000, 100000)
+QUICK_LEADERBOARD_SIZES = (100, 10000)
+
+
+def measure(func, number, repeat=REPEAT):
+    """调用 func() number 次为一轮，返回最快一轮中每次调用的纳秒数"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / number
+
+
+# --- 各组基准，每个函数依次产生 (名称, 测量函数)，测量函数返回每次操作的纳秒数 ---
+# 测量函数在产生后立即被调用，因此可以引用循环中的变量
+
+def bench_physics(scale):
+    bird = create_bird()
+
+    def step_bird():
+        update_bird(bird)
+        bird.y = 300  # 保持在屏幕内，避免数值无限增长
+    yield 'physics.update_bird', lambda: measure(step_bird, 20000 * scale)
+
+    pipe = create_pipe(random.Random(0))
+
+    def step_pipe():
+        update_pipe(pipe)
+        if pipe.x < -pipe.width:
+            pipe.x = SCREEN_WIDTH
+    yield 'physics.update_pipe', lambda: measure(step_pipe, 20000 * scale)
+
+    world = create_world()
+    course = Course(0)
+
+    def step_world():
+        # 每帧把小鸟放到下一个缺口中间，使其不会死亡，管道照常生成、移动、计分和回收
+        bird = world.bird
+        bird.y = 300
+        for pipe in world.pipes:
+            if pipe.x + pipe.width >= bird.x:
+                bird.y = pipe.bottom_y - 90
+                break
+        bird.velocity = 0
+        if update_world(world, course) is not None:
+            reset_world(world)
+            course.reset()
+    yield 'physics.update_world', lambda: measure(step_world, 20000 * scale)
+
+    # 赛道按批生成，这里是摊到每根管道上的耗时
+    generate = Course(0, 'ramp')
+
+    def generate_batch():
+        generate.reset()
+        generate.prefetch()
+    yield 'course.generate_per_pipe', lambda: measure(generate_batch, 200 * scale) / COURSE_BATCH
+
+
+def bench_collision(scale):
+    rng = random.Random(0)
+    bird = create_bird()
+    pipes = [create_pipe(rng) for _ in range(64)]
+    for i, pipe in enumerate(pipes):
+        pipe.x = i * 7 % SCREEN_WIDTH  # 一部分与小鸟重叠，一部分不重叠
+
+    def collide_all():
+        for pipe in pipes:
+            pipe_collide(pipe, bird)
+    yield 'collision.pipe_collide', lambda: measure(collide_all, 500 * scale) / len(pipes)
+
+
+def bench_batch(scale):
+    try:
+        import numpy as np
+        from batch_env import BatchFlappyEnv
+    except ImportError:
+        return  # 没有安装 numpy 时跳过
+    envs = BatchFlappyEnv(10000, seed=0)
+    flaps = np.zeros(10000, dtype=bool)
+    yield 'batch.step_per_world', lambda: measure(lambda: envs.step(flaps), 50 * scale) / 10000
+
+
+def bench_render(scale):
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    font = pygame.font.Font(None, 30)
+    text_cache = SurfaceCache()
+    sprites = SpriteCache(text_cache)
+    rng = random.Random(0)
+    bird = create_bird()
+
+    for count in RENDER_PIPE_COUNTS:
+        pipes = [create_pipe(rng) for _ in range(count)]
+        for i, pipe in enumerate(pipes):
+            pipe.x = i * SCREEN_WIDTH // max(1, count)
+
+        def frame():
+            # 与 main() 中游戏进行时的绘制相同：背景、管道、小鸟、分数面板；
+            # 管道像游戏中一样逐帧移动，blit 的耗时与目标坐标的对齐有关，固定位置测不准
+            screen.fill(SKY_BLUE)
+            for pipe in pipes:
+                pipe.x = (pipe.x - PIPE_SPEED) % SCREEN_WIDTH
+                sprites.blit_pipe(screen, pipe)
+            sprites.blit_bird(screen, bird)
+            screen.blit(sprites.score_panel(font, 12), (10, 10))
+        yield f'render.frame_{count}_pipes', lambda: measure(frame, 200 * scale)
+
+    yield 'render.display_update', lambda: measure(pygame.display.update, 200 * scale)
+
+    # 文字：每次重新渲染 与 经过 SurfaceCache 的缓存渲染
+    texts = [f'得分: {i}' for i in range(50)]
+    yield 'text.render_uncached', lambda: measure(lambda: [font.render(t, True, WHITE) for t in texts], 20 * scale) / len(texts)
+    yield 'text.render_cached', lambda: measure(lambda: [text_cache.render(font, t, WHITE) for t in texts], 20 * scale) / len(texts)
+
+
+def bench_observation(scale):
+    try:
+        from observation import ObservationPipeline
+    except ImportError:
+        return  # 没有安装 numpy 时跳过
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    world = create_world()
+    course = Course(0)
+    for i in range(2):
+        top_height, bottom_y, _ = course.pipe(i)
+        world.pipes.spawn(top_height, bottom_y).x = 150 + i * 200
+    draw_world(screen, SpriteCache(SurfaceCache()), world)
+    pipeline = ObservationPipeline(stack=4)
+    pipeline.reset(screen)
+    yield 'observation.array3d_copy', lambda: measure(lambda: pygame.surfarray.array3d(screen), 20 * scale)
+    yield 'observation.gray_stack4', lambda: measure(lambda: pipeline.observe(screen), 200 * scale)
+
+
+def bench_persistence(scale, sizes):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'highscore.txt')
+        yield 'persistence.write_atomic', lambda: measure(lambda: write_atomic(path, '123'), 20 * scale, repeat=3)
+
+        rng = random.Random(0)
+        for size in sizes:
+            db = os.path.join(tmp, f'leaderboard_{size}.db')
+            store = LeaderboardStore(db)
+            store.add_many((f'p{rng.randrange(1000)}', int(rng.expovariate(1 / 20)), None, 1.7e9 + i)
+                           for i in range(size))
+            store.close()
+
+            def load():
+                LeaderboardStore(db).close()
+            yield f'leaderboard.open_{size}', lambda: measure(load, 10 * scale, repeat=3)
+
+            store = LeaderboardStore(db)
+            yield f'leaderboard.add_{size}', lambda: measure(lambda: store.add('bench', rng.randrange(100)),
+                                                    20 * scale, repeat=3)
+            yield f'leaderboard.top5_{size}', lambda: measure(lambda: store.top(5), 200 * scale)
+            yield f'leaderboard.rank_{size}', lambda: measure(lambda: store.rank(20), 200 * scale)
+            store.close()
+
+
+def run_benchmarks(name_filter=None, quick=False):
+    """运行基准，返回 {名称: {'ns_per_op', 'ops_per_sec'}}"""
+    scale = 1 if quick else 5
+    pygame.init()
+    groups = [
+        bench_physics(scale),
+        bench_collision(scale),
+        bench_batch(scale),
+        bench_render(scale),
+        bench_observation(scale),
+        bench_persistence(scale, QUICK_LEADERBOARD_SIZES if quick else LEADERBOARD_SIZES),
+    ]
+    results = {}
+    for group in groups:
+        for name, run in group:
+            if name_filter and name_filter not in name:
+                continue
+            ns = run()
+            results[name] = {'ns_per_op': ns, 'ops_per_sec': 1e9 / ns if ns > 0 else 0.0}
+            print(f"{name:<32}{ns:>14.1f} ns/op", file=sys.stderr)
+    pygame.quit()
+    return results
+
+
+def environment_info():
+    """记录运行环境，便于区分解释器与编译版本"""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'compiled': '__compiled__' in globals(),  # Nuitka 编译后定义该名称
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, max_regression):
+    """打印与基线的对比，返回变慢超过 max_regression 的基准名称"""
+    regressions = []
+    print(f"{'基准':<32}{'基线 ns':>14}{'当前 ns':>14}{'比例':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32}{'-':>14}{result['ns_per_op']:>14.1f}{'新增':>8}")
+            continue
+        ratio = result['ns_per_op'] / base['ns_per_op']
+        flag = ''
+        if ratio > 1 + max_regression:
+            regressions.append(name)
+            flag = '  变慢'
+        print(f"{name:<32}{base['ns_per_op']:>14.1f}{result['ns_per_op']:>14.1f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能基准")
+    parser.add_argument('--out', help="把结果写入 JSON 文件")
+    parser.add_argument('--baseline', help="与之比较的基线 JSON 文件")
+    parser.add_argument('--results', help="读取已有的结果 JSON 文件而不运行基准，配合 --baseline 使用")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="允许的最大变慢比例，默认 0.2 (20%%)")
+    parser.add_argument('--filter', help="只运行名称包含该字符串的基准")
+    parser.add_argument('--quick', action='store_true', help="减少迭代次数和排行榜规模")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    else:
+        report = {'environment': environment_info(), 'results': run_benchmarks(args.filter, args.quick)}
+    if args.out and not args.results:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(report['results'], baseline, args.max_regression)
+        if regressions:
+            print(f"{len(regressions)} 项基准比基线慢超过 {args.max_regression:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
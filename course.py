@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""赛道：由种子确定的管道序列（出现帧、缺口位置和缺口大小），按难度曲线随得分变化。
+
+第 j 根管道是玩家得到 j 分之后要通过的那一根，所以难度曲线可以直接按管道序号查表，
+整条赛道只取决于种子和难度，与玩家的操作无关：窗口游戏、无界面环境、批量环境、
+解析模拟和录像校验对同一个种子得到的是同一条赛道。
+
+- 每根管道只消耗一个随机数：在默认缺口范围内 randint 抽一个"原始"中心，再按本根管道的
+  缺口大小和与上一根的最大高度差线性映射到允许的范围内。默认的 flat 难度下映射是恒等的，
+  随机数序列与原来逐根调用 init_pipe 完全相同，已有的录像照常校验通过；
+- 管道按 COURSE_BATCH 根一批预先生成，逐帧推进时出管只是读取列表；开局时 prefetch() 生成第一批，
+  之后由游戏循环在逻辑帧之外调用 top_up() 补充，批次生成不会落在某一帧里；
+- 不传种子开始下一局时接着上一局的随机数序列生成，上一局预先生成而没有用到的管道丢弃。
+
+命令行用法::
+
+    python course.py --seed 42 --difficulty ramp --count 20   # 打印赛道的前若干根管道
+"""
+import argparse
+import bisect
+import random
+
+from game_logic import (
+    SCREEN_HEIGHT, PIPE_GAP, PIPE_INTERVAL_TICKS, FIRST_PIPE_DELAY_TICKS, PIPE_LIFETIME_TICKS,
+    MIN_PIPE_INTERVAL_TICKS, create_bird
+)
+
+COURSE_BATCH = 64  # 每次预先生成的管道数
+GAP_MARGIN = 50    # 上下管道至少保留的高度
+# 原始缺口中心的取值范围，与 init_pipe 相同
+RAW_CENTER_MIN = PIPE_GAP // 2 + GAP_MARGIN
+RAW_CENTER_MAX = SCREEN_HEIGHT - PIPE_GAP // 2 - GAP_MARGIN
+MIN_GAP = create_bird().height + 30  # 缺口至少比小鸟高这么多
+MAX_GAP = SCREEN_HEIGHT - 2 * GAP_MARGIN
+
+
+class DifficultyCurve:
+    """难度曲线：得分 -> (缺口大小, 到下一根管道的帧数, 与上一根缺口中心的最大高度差)
+
+    points 为 [(得分, 缺口大小, 间隔帧数, 最大高度差), ...]，按得分升序；
+    关键点之间线性插值，最后一个关键点之后保持不变。
+    """
+
+    def __init__(self, points):
+        points = sorted(points)
+        if not points or points[0][0] != 0:
+            raise ValueError("难度曲线必须从 0 分开始")
+        for score, gap, interval, shift in points:
+            if not MIN_GAP <= gap <= MAX_GAP:
+                raise ValueError(f"缺口大小必须在 {MIN_GAP} 到 {MAX_GAP} 之间: {gap}")
+            if interval < MIN_PIPE_INTERVAL_TICKS:
+                raise ValueError(f"出管间隔不能少于 {MIN_PIPE_INTERVAL_TICKS} 帧: {interval}")
+            if shift < 0:
+                raise ValueError(f"最大高度差不能为负: {shift}")
+        self.points = tuple(points)
+        # 逐分查表，出管时不需要插值
+        self.table = tuple(self._interpolate(score) for score in range(points[-1][0] + 1))
+        self.min_interval = min(interval for _, interval, _ in self.table)
+        # 同一时刻最多存在的管道数，批量环境按它分配槽位
+        self.max_pipes = -(-PIPE_LIFETIME_TICKS // self.min_interval)
+
+    def _interpolate(self, score):
+        points = self.points
+        i = bisect.bisect_right([p[0] for p in points], score) - 1
+        if i == len(points) - 1:
+            return points[i][1:]
+        (s0, *a), (s1, *b) = points[i], points[i + 1]
+        return tuple(round(x + (y - x) * (score - s0) / (s1 - s0)) for x, y in zip(a, b))
+
+    def __call__(self, score):
+        table = self.table
+        return table[score] if score < len(table) else table[-1]
+
+
+CURVES = {
+    # 原版规则：固定缺口和间隔，缺口位置完全随机
+    'flat': DifficultyCurve([(0, PIPE_GAP, PIPE_INTERVAL_TICKS, SCREEN_HEIGHT)]),
+    # 开局缺口大、相邻缺口高度接近，随得分逐渐变窄、变密、起伏变大
+    'ramp': DifficultyCurve([(0, 190, 110, 120), (25, 160, 95, 200), (80, 130, 80, 240)]),
+}
+DEFAULT_DIFFICULTY = 'flat'
+
+
+def get_curve(difficulty):
+    """按名字取难度曲线"""
+    try:
+        return CURVES[difficulty]
+    except KeyError:
+        raise ValueError(f"未知的难度: {difficulty}（可选 {', '.join(CURVES)}）") from None
+
+
+def gap_center(raw, gap, shift, previous):
+    """把原始缺口中心 raw 映射到本根管道允许的范围内；previous 为上一根的缺口中心（第一根为 None）"""
+    lo = gap // 2 + GAP_MARGIN
+    hi = SCREEN_HEIGHT - GAP_MARGIN - (gap - gap // 2)
+    if previous is not None:
+        lo, hi = max(lo, min(previous - shift, hi)), min(hi, max(previous + shift, lo))
+    return lo + (raw - RAW_CENTER_MIN) * (hi - lo) // (RAW_CENTER_MAX - RAW_CENTER_MIN)
+
+
+class Course:
+    """一局的赛道：第 j 根管道的出现帧和缺口，按批惰性生成"""
+
+    def __init__(self, seed=None, difficulty=DEFAULT_DIFFICULTY):
+        self.rng = random.Random(seed)
+        self.difficulty = difficulty
+        self.curve = get_curve(difficulty)
+        self.spawn_ticks = []  # 第 j 根管道出现的帧（update_world 中 world.tick 的值）
+        self.tops = []         # 上管道高度
+        self.bottoms = []      # 下管道顶部的 y
+        self.intervals = []    # 到下一根管道的帧数
+        self._center = None
+        self._next_spawn = FIRST_PIPE_DELAY_TICKS
+
+    def reset(self, seed=None):
+        """开始新的一局；传入 seed 时重新设定随机数序列，否则接着上一局的序列生成"""
+        if seed is not None:
+            self.rng.seed(seed)
+        self.spawn_ticks.clear()
+        self.tops.clear()
+        self.bottoms.clear()
+        self.intervals.clear()
+        self._center = None
+        self._next_spawn = FIRST_PIPE_DELAY_TICKS
+        return self
+
+    def prefetch(self):
+        """预先生成第一批管道（结果与第一根管道出现时再生成相同），开局时调用以免占用帧时间"""
+        if not self.tops:
+            self._extend()
+
+    def top_up(self, j):
+        """第 j 根及之后已生成的管道不到半批时再生成一批；在逻辑帧之外调用（渲染之后、调度间隙）"""
+        if len(self.tops) - j < COURSE_BATCH // 2:
+            self._extend()
+
+    def _extend(self):
+        """再生成 COURSE_BATCH 根管道"""
+        randint, curve = self.rng.randint, self.curve
+        center, spawn = self._center, self._next_spawn
+        for j in range(len(self.tops), len(self.tops) + COURSE_BATCH):
+            gap, interval, shift = curve(j)
+            center = gap_center(randint(RAW_CENTER_MIN, RAW_CENTER_MAX), gap, shift, center)
+            top = center - gap // 2
+            self.spawn_ticks.append(spawn)
+            self.tops.append(top)
+            self.bottoms.append(top + gap)
+            self.intervals.append(interval)
+            spawn += interval
+        self._center, self._next_spawn = center, spawn
+
+    def pipe(self, j):
+        """第 j 根管道的 (上管道高度, 下管道顶部, 到下一根管道的帧数)"""
+        while j >= len(self.tops):
+            self._extend()
+        return self.tops[j], self.bottoms[j], self.intervals[j]
+
+    def spawn_tick(self, j):
+        """第 j 根管道出现的帧"""
+        while j >= len(self.tops):
+            self._extend()
+        return self.spawn_ticks[j]
+
+    def count_until(self, tick):
+        """出现帧不晚于 tick 的管道数"""
+        while self._next_spawn <= tick:
+            self._extend()
+        return bisect.bisect_right(self.spawn_ticks, tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="打印赛道")
+    parser.add_argument('--seed', type=int, default=0, help="种子")
+    parser.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY, help="难度曲线")
+    parser.add_argument('--count', type=int, default=20, help="管道数")
+    args = parser.parse_args()
+
+    course = Course(args.seed, args.difficulty)
+    print("序号   出现帧   上管道   下管道   缺口   间隔")
+    for j in range(args.count):
+        top, bottom, interval = course.pipe(j)
+        print(f"{j:>4} {course.spawn_tick(j):>8} {top:>8} {bottom:>8} {bottom - top:>6} {interval:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""无界面的游戏环境：复用 game_logic 中的物理、碰撞和计分规则。
+
+用法::
+
+    env = FlappyEnv()
+    state = env.reset(seed=42)
+    while True:
+        state, reward, done = env.step(flap=False)
+        if done:
+            break
+
+环境不会初始化 pygame，也不会接触窗口或时钟，逻辑帧的推进速度只受 CPU 限制。
+管道由 course.Course 按种子和难度曲线生成，与窗口游戏中同一种子的赛道相同。
+"""
+from course import DEFAULT_DIFFICULTY, Course
+from game_logic import create_world, jump_bird, reset_world, update_world
+
+
+class FlappyEnv:
+    """单局无界面游戏环境"""
+
+    def __init__(self, seed=None, difficulty=DEFAULT_DIFFICULTY):
+        self.course = Course(seed, difficulty)
+        self.world = None
+        self.done = True
+        self.death_cause = None
+
+    def reset(self, seed=None):
+        """开始新的一局；传入 seed 时重新设定管道随机数序列"""
+        self.course.reset(seed)
+        if self.world is None:
+            self.world = create_world()
+        else:
+            reset_world(self.world)
+        self.done = False
+        self.death_cause = None
+        return self.world
+
+    def step(self, flap):
+        """推进一帧，返回 (state, reward, done)；reward 为本帧新增的得分
+
+        state 是原地更新的 World 对象，需要保留某一帧的数据时请自行复制。
+        """
+        if self.done:
+            raise RuntimeError("本局已经结束，请先调用 reset()")
+        world = self.world
+        if flap:
+            jump_bird(world.bird)
+        score_before = world.score
+        self.death_cause = update_world(world, self.course)
+        self.done = self.death_cause is not None
+        return world, world.score - score_before, self.done
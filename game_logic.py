@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""像素小鸟的纯逻辑部分：物理常量、小鸟/管道状态以及碰撞与计分规则。
+
+本模块不依赖 pygame，不会创建窗口也不读取时钟，
+因此可以在无界面的模拟进程里直接导入使用。
+"""
+import random
+
+# 游戏常量
+SCREEN_WIDTH = 400
+SCREEN_HEIGHT = 600
+GRAVITY = 0.25
+BIRD_JUMP = -7
+PIPE_SPEED = 3
+PIPE_GAP = 150
+PIPE_WIDTH = 60
+PIPE_FREQUENCY = 1500  # 毫秒
+
+# 逻辑帧（tick）相关常量：管道生成按帧计数，而不是按真实毫秒
+TICK_RATE = 60  # 每秒逻辑帧数
+PIPE_INTERVAL_TICKS = PIPE_FREQUENCY * TICK_RATE // 1000  # 默认难度下两根管道之间的帧数
+FIRST_PIPE_DELAY_TICKS = (PIPE_FREQUENCY - 500) * TICK_RATE // 1000  # 开局后第一根管道的延迟
+
+# 难度曲线允许的最小出管间隔（见 course.py），须大于小鸟与一根管道横向重叠的帧数
+MIN_PIPE_INTERVAL_TICKS = 60
+
+# 同一局中最多同时存在的管道数：一根管道的存活帧数 / 最小出管间隔，向上取整
+PIPE_LIFETIME_TICKS = -(-(SCREEN_WIDTH + PIPE_WIDTH) // PIPE_SPEED)
+MAX_PIPES = -(-PIPE_LIFETIME_TICKS // MIN_PIPE_INTERVAL_TICKS)
+
+# 死亡原因
+DEATH_GROUND = 'ground'
+DEATH_PIPE = 'pipe'
+
+# --- 游戏状态结构 ---
+# 状态对象使用 __slots__ 并在每帧原地更新，避免逐帧复制字典带来的分配和 GC 压力
+
+class Bird:
+    """小鸟状态"""
+    __slots__ = ('x', 'y', 'velocity', 'width', 'height')
+
+    def __init__(self, x, y, velocity, width, height):
+        self.x = x
+        self.y = y
+        self.velocity = velocity
+        self.width = width
+        self.height = height
+
+
+class Pipe:
+    """管道状态；上下两段的碰撞矩形由这些字段直接给出，无需每帧创建 Rect"""
+    __slots__ = ('x', 'width', 'top_height', 'bottom_y', 'bottom_height', 'passed')
+
+    def __init__(self):
+        self.x = SCREEN_WIDTH
+        self.width = PIPE_WIDTH
+        self.top_height = 0     # 上管道的高度
+        self.bottom_y = 0       # 下管道的顶部Y坐标
+        self.bottom_height = 0  # 下管道的高度
+        self.passed = False
+
+
+class PipeRing:
+    """固定容量的管道环形缓冲区，管道对象循环复用
+
+    管道总是按生成顺序从左侧离开屏幕，所以只需在尾部生成、在头部移除。
+    """
+    __slots__ = ('_pipes', '_head', '_count')
+
+    def __init__(self, capacity=MAX_PIPES):
+        self._pipes = [Pipe() for _ in range(capacity)]
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        pipes, head, capacity = self._pipes, self._head, len(self._pipes)
+        for i in range(self._count):
+            yield pipes[(head + i) % capacity]
+
+    def __getitem__(self, index):
+        if not -self._count <= index < self._count:
+            raise IndexError("管道下标越界")
+        return self._pipes[(self._head + index % self._count) % len(self._pipes)]
+
+    def spawn(self, top_height, bottom_y):
+        """在尾部生成一根缺口为 [top_height, bottom_y) 的新管道（复用最早回收的对象）"""
+        capacity = len(self._pipes)
+        if self._count == capacity:
+            raise RuntimeError("管道数量超过环形缓冲区容量")
+        pipe = self._pipes[(self._head + self._count) % capacity]
+        self._count += 1
+        return set_pipe_gap(pipe, top_height, bottom_y)
+
+    def pop_front(self):
+        """移除最早生成的管道"""
+        self._head = (self._head + 1) % len(self._pipes)
+        self._count -= 1
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+
+class World:
+    """一局游戏的逻辑状态（小鸟、管道、分数和帧计数）"""
+    __slots__ = ('bird', 'pipes', 'score', 'tick', 'pipe_index', 'next_pipe_tick')
+
+    def __init__(self):
+        self.bird = create_bird()
+        self.pipes = PipeRing()
+        self.score = 0
+        self.tick = 0
+        self.pipe_index = 0 # 下一根管道在赛道中的序号
+        self.next_pipe_tick = FIRST_PIPE_DELAY_TICKS # 稍微延迟第一次出管
+
+# --- 游戏元素函数 ---
+
+def create_bird():
+    """创建小鸟状态"""
+    return Bird(100, SCREEN_HEIGHT // 2, 0, 30, 30)
+
+def reset_bird(bird):
+    """把小鸟恢复到开局位置"""
+    bird.y = SCREEN_HEIGHT // 2
+    bird.velocity = 0
+    return bird
+
+def update_bird(bird):
+    """原地更新小鸟状态"""
+    velocity = bird.velocity + GRAVITY
+    y = bird.y + velocity
+
+    # 防止飞出顶部
+    if y < 0:
+        y = 0
+        velocity = 0
+
+    # 不在这里处理落地，落地是碰撞/结束条件
+    bird.velocity = velocity
+    bird.y = y
+    return bird
+
+def jump_bird(bird):
+    """小鸟跳跃"""
+    bird.velocity = BIRD_JUMP
+    return bird
+
+def bird_hit_ground(bird):
+    """检测小鸟是否落地"""
+    return bird.y + bird.height >= SCREEN_HEIGHT
+
+def set_pipe_gap(pipe, top_height, bottom_y):
+    """设置管道的缺口并放到屏幕右侧"""
+    pipe.x = SCREEN_WIDTH
+    pipe.width = PIPE_WIDTH
+    pipe.top_height = top_height
+    pipe.bottom_y = bottom_y
+    pipe.bottom_height = SCREEN_HEIGHT - bottom_y
+    pipe.passed = False
+    return pipe
+
+def init_pipe(pipe, rng=random):
+    """为管道随机生成缺口并放到屏幕右侧 (rng 默认使用全局 random 模块)"""
+    # 随机化缺口中心的位置，确保管道至少有一定高度
+    min_center_y = PIPE_GAP // 2 + 50
+    max_center_y = SCREEN_HEIGHT - PIPE_GAP // 2 - 50
+    gap_center_y = rng.randint(min_center_y, max_center_y)
+    return set_pipe_gap(pipe, gap_center_y - PIPE_GAP // 2, gap_center_y + PIPE_GAP // 2)
+
+def create_pipe(rng=random):
+    """创建一根新管道"""
+    return init_pipe(Pipe(), rng)
+
+def update_pipe(pipe):
+    """原地更新管道位置"""
+    pipe.x -= PIPE_SPEED
+    return pipe
+
+def rects_overlap(ax, ay, aw, ah, bx, by, bw, bh):
+    """矩形相交检测，语义与 pygame.Rect.colliderect 一致（空矩形不相交）"""
+    if aw <= 0 or ah <= 0 or bw <= 0 or bh <= 0:
+        return False
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+def pipe_collide(pipe, bird):
+    """检测管道与小鸟碰撞"""
+    # pygame.Rect 会把浮点坐标截断为整数，这里保持相同的取整方式
+    bx, by = int(bird.x), int(bird.y)
+    bw, bh = bird.width, bird.height
+    px, pw = pipe.x, pipe.width
+    return (rects_overlap(bx, by, bw, bh, px, 0, pw, pipe.top_height) or
+            rects_overlap(bx, by, bw, bh, px, pipe.bottom_y, pw, pipe.bottom_height))
+
+# --- 世界状态 ---
+
+def create_world():
+    """创建一局游戏的逻辑状态"""
+    return World()
+
+def reset_world(world):
+    """原地把世界恢复到开局状态，复用已有的小鸟和管道对象"""
+    reset_bird(world.bird)
+    world.pipes.clear()
+    world.score = 0
+    world.tick = 0
+    world.pipe_index = 0
+    world.next_pipe_tick = FIRST_PIPE_DELAY_TICKS
+    return world
+
+def update_world(world, course):
+    """推进一帧游戏逻辑（原地修改 world），返回本帧的死亡原因，仍存活时返回 None
+
+    course 为本局的赛道 (course.Course)，按序号给出每根管道的缺口和到下一根的间隔。
+    """
+    cause = None
+
+    # 更新小鸟
+    bird = update_bird(world.bird)
+
+    # 检测小鸟是否落地 (碰撞)
+    if bird_hit_ground(bird):
+        cause = DEATH_GROUND
+
+    # 生成新管道
+    world.tick += 1
+    pipes = world.pipes
+    if world.tick == world.next_pipe_tick:
+        top_height, bottom_y, interval = course.pipe(world.pipe_index)
+        pipes.spawn(top_height, bottom_y)
+        world.pipe_index += 1
+        world.next_pipe_tick += interval
+
+    # 更新管道并处理碰撞和计分
+    bird_center_x = bird.x + bird.width // 2
+    expired = 0
+    ring, head, capacity = pipes._pipes, pipes._head, len(pipes._pipes)
+    for i in range(pipes._count):
+        pipe = ring[(head + i) % capacity]
+        # 管道碰撞检测
+        if pipe_collide(pipe, bird):
+            if cause is None:
+                cause = DEATH_PIPE
+            # 碰撞后不需要再更新这条管道的位置了，但还是要保留以绘制结束画面
+            continue
+
+        # 更新管道位置
+        update_pipe(pipe)
+
+        # 计分逻辑
+        if not pipe.passed and bird_center_x > pipe.x + pipe.width:
+            pipe.passed = True
+            world.score += 1
+
+        # 离开屏幕的管道总是排在最前面
+        if pipe.x <= -pipe.width:
+            expired += 1
+
+    for _ in range(expired):
+        pipes.pop_front()
+    return cause
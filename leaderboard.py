@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""排行榜存储：用 SQLite 保存每一条成绩，按需查询前 K 名、名次和玩家最佳成绩。
+
+- runs 表保存全部成绩，(score, id) 上的索引让前 K 名和分页查询只读需要的行；
+- score_totals / score_counts 表按分数（每日榜再加上日期）记录成绩条数，
+  名次 = 1 + 分数更高的条数，只需要累加不同分数的计数，与总条数无关；
+  翻页时也先用计数跳过整段分数，再在同分的成绩里取偏移；
+- players 表保存每个玩家的最佳成绩。
+
+每次写入都在一个事务里完成，数据库使用 WAL 日志，程序崩溃或断电时
+不会留下写了一半的排行榜。旧版的 leaderboard.json 在第一次打开时自动导入。
+
+命令行用法::
+
+    python leaderboard.py top --limit 10 [--day 2025-04-26]
+    python leaderboard.py import leaderboard.json
+    python leaderboard.py compact --max-runs 100000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+LEADERBOARD_DB = "leaderboard.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    created REAL NOT NULL,
+    replay TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC, id);
+CREATE INDEX IF NOT EXISTS runs_day_score ON runs (day, score DESC, id);
+CREATE TABLE IF NOT EXISTS score_counts (
+    day TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, score)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS score_totals (
+    score INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    name TEXT PRIMARY KEY,
+    best INTEGER NOT NULL,
+    run_id INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS players_best ON players (best DESC, run_id);
+"""
+
+_ENTRY_COLUMNS = "runs.name, runs.score, runs.replay, runs.day"
+
+
+def day_of(timestamp):
+    """时间戳对应的本地日期，作为每日排行榜的键"""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+def _entry(row):
+    """把查询结果转换为与旧版 JSON 排行榜相同格式的字典"""
+    name, score, replay, day = row
+    entry = {"name": name, "score": score, "day": day}
+    if replay:
+        entry["replay"] = replay
+    return entry
+
+
+class LeaderboardStore:
+    """基于 SQLite 的排行榜，保存全部成绩"""
+
+    def __init__(self, path=LEADERBOARD_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        if path != ':memory:':
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # --- 写入 ---
+
+    def _insert(self, name, score, replay, timestamp):
+        cur = self.conn.execute(
+            "INSERT INTO runs (name, score, day, created, replay) VALUES (?, ?, ?, ?, ?)",
+            (name, score, day_of(timestamp), timestamp, replay))
+        run_id = cur.lastrowid
+        self.conn.execute(
+            "INSERT INTO score_counts (day, score, count) VALUES (?, ?, 1) "
+            "ON CONFLICT (day, score) DO UPDATE SET count = count + 1",
+            (day_of(timestamp), score))
+        self.conn.execute(
+            "INSERT INTO score_totals (score, count) VALUES (?, 1) "
+            "ON CONFLICT (score) DO UPDATE SET count = count + 1",
+            (score,))
+        self.conn.execute(
+            "INSERT INTO players (name, best, run_id) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET best = excluded.best, run_id = excluded.run_id "
+            "WHERE excluded.best > players.best",
+            (name, score, run_id))
+        return run_id
+
+    def add(self, name, score, replay=None, timestamp=None):
+        """记录一条成绩，返回其编号；replay 为对应的录像文件名"""
+        with self.conn:
+            return self._insert(name, score, replay, time.time() if timestamp is None else timestamp)
+
+    def add_many(self, entries):
+        """在一个事务中批量记录 (名字, 分数, 录像, 时间戳) 序列，返回条数"""
+        count = 0
+        with self.conn:
+            for name, score, replay, timestamp in entries:
+                self._insert(name, score, replay, timestamp)
+                count += 1
+        return count
+
+    def import_json(self, path):
+        """导入旧版 JSON 排行榜（条目没有时间，使用文件的修改时间），返回导入的条数"""
+        with open(path, 'r', encoding='utf-8') as f:
+            entries = json.load(f)
+        timestamp = os.path.getmtime(path)
+        return self.add_many((entry["name"], int(entry["score"]), entry.get("replay"), timestamp)
+                             for entry in entries)
+
+    # --- 查询 ---
+
+    def _score_counts(self, day):
+        """按分数从高到低返回 (分数, 条数)"""
+        if day is None:
+            return self.conn.execute("SELECT score, count FROM score_totals ORDER BY score DESC")
+        return self.conn.execute(
+            "SELECT score, count FROM score_counts WHERE day = ? ORDER BY score DESC", (day,))
+
+    def top(self, limit, offset=0, day=None):
+        """分数从高到低的第 offset+1 到 offset+limit 条成绩；day 为 None 时为总榜"""
+        # 用分数计数跳过整段分数，剩下的偏移只落在同一个分数内
+        start_score = None
+        for score, count in self._score_counts(day):
+            if offset < count:
+                start_score = score
+                break
+            offset -= count
+        if start_score is None:
+            return []
+        if day is None:
+            rows = self.conn.execute(
+                f"SELECT {_ENTRY_COLUMNS} FROM runs WHERE score <= ? "
+                "ORDER BY score DESC, id LIMIT ? OFFSET ?",
+                (start_score, limit, offset))
+        else:
+            rows = self.conn.execute(
+                f"SELECT {_ENTRY_COLUMNS} FROM runs WHERE day = ? AND score <= ? "
+                "ORDER BY score DESC, id LIMIT ? OFFSET ?",
+                (day, start_score, limit, offset))
+        return [_entry(row) for row in rows]
+
+    def count(self, day=None):
+        """成绩总条数"""
+        if day is None:
+            row = self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM score_totals").fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE day = ?", (day,)).fetchone()
+        return row[0]
+
+    def rank(self, score, day=None):
+        """分数 score 在榜上的名次（并列时取最高名次）"""
+        if day is None:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM score_totals WHERE score > ?", (score,)).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(count), 0) FROM score_counts WHERE day = ? AND score > ?",
+                (day, score)).fetchone()
+        return row[0] + 1
+
+    def player_best(self, name):
+        """玩家的最佳成绩，没有记录时返回 None"""
+        row = self.conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM runs WHERE id = (SELECT run_id FROM players WHERE name = ?)",
+            (name,)).fetchone()
+        return _entry(row) if row else None
+
+    def top_players(self, limit, offset=0):
+        """按最佳成绩排序的玩家榜，每个玩家只出现一次"""
+        rows = self.conn.execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM players JOIN runs ON runs.id = players.run_id "
+            "ORDER BY players.best DESC, players.run_id LIMIT ? OFFSET ?",
+            (limit, offset))
+        return [_entry(row) for row in rows]
+
+    # --- 维护 ---
+
+    def compact(self, max_runs=None):
+        """整理数据库文件；给出 max_runs 时只保留分数最高的 max_runs 条成绩（玩家最佳成绩始终保留）"""
+        if max_runs is not None:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM runs WHERE id NOT IN (SELECT id FROM runs ORDER BY score DESC, id LIMIT ?) "
+                    "AND id NOT IN (SELECT run_id FROM players)",
+                    (max_runs,))
+                self.conn.execute("DELETE FROM score_counts")
+                self.conn.execute(
+                    "INSERT INTO score_counts (day, score, count) "
+                    "SELECT day, score, COUNT(*) FROM runs GROUP BY day, score")
+                self.conn.execute("DELETE FROM score_totals")
+                self.conn.execute(
+                    "INSERT INTO score_totals (score, count) "
+                    "SELECT score, COUNT(*) FROM runs GROUP BY score")
+        if self.path != ':memory:':
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+
+
+class LeaderboardWriter:
+    """供后台写入线程调用的批量写入函数；数据库连接在第一次写入时由该线程创建
+
+    WAL 模式下读写可以同时进行，游戏线程用自己的连接查询，不会被写入阻塞。
+    """
+
+    def __init__(self, path=LEADERBOARD_DB):
+        self.path = path
+        self._store = None
+
+    def __call__(self, entries):
+        """在一个事务中写入 (名字, 分数, 录像, 时间戳) 列表"""
+        if self._store is None:
+            self._store = LeaderboardStore(self.path)
+        self._store.add_many(entries)
+
+    def close(self):
+        """关闭连接；必须在执行写入的同一线程中调用"""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+
+def open_leaderboard(path=LEADERBOARD_DB, legacy_json=None):
+    """打开排行榜数据库；legacy_json 存在且数据库为空时先导入，导入后把旧文件改名为 .bak"""
+    store = LeaderboardStore(path)
+    if legacy_json and os.path.exists(legacy_json) and store.count() == 0:
+        try:
+            imported = store.import_json(legacy_json)
+            os.replace(legacy_json, legacy_json + '.bak')
+            print(f"从 {legacy_json} 导入了 {imported} 条排行榜记录")
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError, IOError) as e:
+            print(f"警告: 无法导入旧排行榜 {legacy_json}: {e}。")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="排行榜数据库工具")
+    parser.add_argument('--db', default=LEADERBOARD_DB, help="数据库文件")
+    sub = parser.add_subparsers(dest='command', required=True)
+    top = sub.add_parser('top', help="显示前几名")
+    top.add_argument('--limit', type=int, default=10)
+    top.add_argument('--offset', type=int, default=0)
+    top.add_argument('--day', help="只看某一天 (YYYY-MM-DD)")
+    top.add_argument('--players', action='store_true', help="每个玩家只显示最佳成绩")
+    imp = sub.add_parser('import', help="导入旧版 JSON 排行榜")
+    imp.add_argument('path')
+    compact = sub.add_parser('compact', help="整理数据库文件")
+    compact.add_argument('--max-runs', type=int, default=None, help="只保留分数最高的若干条成绩")
+    args = parser.parse_args()
+
+    store = LeaderboardStore(args.db)
+    try:
+        if args.command == 'top':
+            if args.players:
+                entries = store.top_players(args.limit, args.offset)
+            else:
+                entries = store.top(args.limit, args.offset, day=args.day)
+            for i, entry in enumerate(entries, start=args.offset + 1):
+                print(f"{i}. {entry['name']} : {entry['score']}  ({entry['day']})")
+            print(f"共 {store.count(day=args.day)} 条记录")
+        elif args.command == 'import':
+            print(f"导入了 {store.import_json(args.path)} 条记录")
+        else:
+            before = os.path.getsize(args.db)
+            store.compact(args.max_runs)
+            print(f"整理完成: {before} -> {os.path.getsize(args.db)} 字节，剩余 {store.count()} 条记录")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,55 +1,140 @@
 # -*- coding: utf-8 -*-
+import time
+STARTED_NS = time.perf_counter_ns() # 启动计时的起点，--startup-report 从这里开始统计
+
+import argparse
+import json
 import pygame
-import random
 import sys
 import math
 import os
-import json  # 添加json模块用于处理排行榜数据
-
-# 初始化pygame
-pygame.init()
-
-# 游戏常量
-SCREEN_WIDTH = 400
-SCREEN_HEIGHT = 600
-GRAVITY = 0.25
-BIRD_JUMP = -7
-PIPE_SPEED = 3
-PIPE_GAP = 150
-PIPE_FREQUENCY = 1500  # 毫秒
-
-# 颜色
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-SKY_BLUE = (100, 150, 255) # 定义背景色
-PIPE_GREEN = (0, 180, 0)
-PIPE_BORDER_GREEN = (0, 220, 0)
-BIRD_YELLOW = (255, 200, 0)
-BEAK_ORANGE = (255, 100, 0)
-TEXT_BG_COLOR = (0, 0, 0, 128) # 分数背景半透明黑
-
-# 创建游戏窗口
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('像素小鸟')
-clock = pygame.time.Clock()
-
-# 尝试加载支持中文的字体，如果失败则使用默认字体
-try:
-    font = pygame.font.SysFont('Noto Sans CJK TC', 30) # 尝试使用 SimHei
-    highscore_font = pygame.font.SysFont('Noto Sans CJK TC', 25) # 尝试使用 SimHei
-except pygame.error:
-    print("警告: 找不到 SimHei 字体, 使用默认字体。中文可能无法正确显示。")
-    font = pygame.font.Font(None, 30) # Pygame 默认字体
-    highscore_font = pygame.font.Font(None, 25) # Pygame 默认字体
+import sqlite3
+
+from game_logic import (
+    SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_SPEED, TICK_RATE, World, create_bird, jump_bird, reset_world,
+    update_world
+)
+from course import CURVES, DEFAULT_DIFFICULTY, Course
+from leaderboard import LEADERBOARD_DB, LeaderboardStore, LeaderboardWriter, day_of, open_leaderboard
+from persistence import BackgroundWriter, write_atomic
+from replay import (
+    REPLAY_DIR, Replay, ReplayError, ReplayPlayer, ReplayRecorder, new_seed, replay_file_name
+)
+from runstats import RUNSTATS_DIR, RunStats, RunStatsWriter, day_name, run_record
+from profiler import FrameProfiler, NullProfiler, StartupTimer
+from render import WHITE, RED, SKY_BLUE, SurfaceCache, SpriteCache, DirtyRectRenderer, ProfileOverlay
+from timestep import FixedTimestep
+
+# 窗口、时钟和字体在 init_display() 中创建，导入本模块时不会打开窗口
+screen = None
+clock = None
+font = None
+highscore_font = None
+text_cache = None # 文字渲染缓存
+sprites = None # 预烘焙的小鸟、管道和分数面板
+renderer = None # 负责把画面提交到显示（可选脏矩形模式）
+writer = None # 后台写入线程，在 main() 中创建
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='像素小鸟')
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help='只提交画面中变化的区域，降低软件渲染时的 CPU 占用')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='渲染帧率上限，0 表示不限制 (逻辑帧率固定为 60)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='模拟速度倍率，大于 1 时快于真实时间')
+    parser.add_argument('--replay', metavar='FILE',
+                        help='回放录像文件 (←/→ 跳转，F 快进，空格重播)')
+    parser.add_argument('--profile', action='store_true',
+                        help='从启动起记录各阶段耗时并显示性能浮层 (F3 切换)')
+    parser.add_argument('--profile-out', metavar='FILE',
+                        help='退出时把逐帧耗时导出到 FILE (.csv 或 .json)')
+    parser.add_argument('--demo', action='store_true',
+                        help='启动后直接进入演示模式，由自动驾驶操控小鸟 (开始界面按 A 也可进入)')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='显示第一帧后打印启动耗时分解')
+    parser.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY,
+                        help='难度曲线：flat 为原版固定难度，ramp 随得分逐渐变难')
+    parser.add_argument('--rescan-fonts', action='store_true',
+                        help='忽略字体缓存重新查找字体 (安装字体后使用)')
+    return parser.parse_args(argv)
+
+def resolve_font(name, rescan=False):
+    """查找字体文件路径；结果（包括找不到）缓存在 FONT_CACHE_FILE 中，之后启动时不必扫描系统字体
+
+    rescan 为 True 时忽略缓存重新扫描，用于安装字体之后。
+    """
+    try:
+        with open(FONT_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (IOError, ValueError):
+        cache = {}
+    if name in cache and not rescan:
+        path = cache[name]
+        if path is None or os.path.exists(path): # None 表示上次没有找到
+            return path
+    path = pygame.font.match_font(name) # 扫描系统字体列表，较慢
+    cache[name] = path
+    try:
+        write_atomic(FONT_CACHE_FILE, json.dumps(cache, ensure_ascii=False))
+    except OSError as e:
+        print(f"警告: 无法保存字体缓存 {FONT_CACHE_FILE}: {e}。")
+    return path
+
+def init_display(dirty_rects=False, startup=None, rescan_fonts=False):
+    """初始化显示和字体、创建游戏窗口并加载字体；startup 为 StartupTimer 时记录各步骤耗时"""
+    global screen, clock, font, highscore_font, text_cache, sprites, renderer
+    # 只初始化用到的显示和字体模块，不初始化音频等其他子系统
+    pygame.display.init()
+    pygame.font.init()
+    if startup:
+        startup.mark('初始化 SDL')
+
+    # 创建游戏窗口
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption('像素小鸟')
+    clock = pygame.time.Clock()
+    if startup:
+        startup.mark('创建窗口')
+
+    # 尝试加载支持中文的字体，如果失败则使用默认字体
+    font_path = resolve_font(FONT_NAME, rescan_fonts)
+    if startup:
+        startup.mark('查找字体')
+    if font_path is None:
+        print(f"警告: 找不到 {FONT_NAME} 字体, 使用默认字体。中文可能无法正确显示。"
+              f"安装字体后请用 --rescan-fonts 重新查找。")
+    try:
+        font = pygame.font.Font(font_path, 30)
+        highscore_font = pygame.font.Font(font_path, 25)
+    except (OSError, pygame.error) as e:
+        print(f"警告: 无法加载字体 {font_path}: {e}。使用默认字体。")
+        font = pygame.font.Font(None, 30) # Pygame 默认字体
+        highscore_font = pygame.font.Font(None, 25) # Pygame 默认字体
+    if startup:
+        startup.mark('加载字体')
+
+    text_cache = SurfaceCache()
+    sprites = SpriteCache(text_cache)
+    renderer = DirtyRectRenderer(enabled=dirty_rects)
+    if startup:
+        startup.mark('烘焙精灵')
 
 
 # 文件路径
 HIGHSCORE_FILE = "highscore.txt"
-LEADERBOARD_FILE = "leaderboard.json"  # 新增排行榜文件
-MAX_LEADERBOARD_ENTRIES = 5  # 排行榜显示的最大记录数
+FONT_CACHE_FILE = "font_cache.json"  # 字体名到字体文件路径的缓存
+LEADERBOARD_FILE = "leaderboard.json"  # 旧版排行榜文件，首次运行时导入数据库
+MAX_LEADERBOARD_ENTRIES = 5  # 排行榜每页显示的记录数
+FONT_NAME = 'Noto Sans CJK TC'  # 支持中文的字体
+
+FAST_FORWARD_SPEED = 8  # 快进时的模拟速度倍率
+FAST_FORWARD_RENDER_FPS = 10  # 快进时每秒绘制的画面数
+REPLAY_SEEK_TICKS = 5 * TICK_RATE  # 回放时每次跳转的帧数 (5 秒)
+NOTICE_SECONDS = 3  # 保存出错等提示在屏幕上停留的秒数
+STATS_DAYS = 5  # 统计界面按天显示的天数
+DEMO_RESTART_SECONDS = 2  # 演示模式中小鸟死亡后自动重开的等待秒数
 
 # --- 辅助函数 ---
 
@@ -69,218 +154,284 @@ def load_highscore():
         return 0
 
 def save_highscore(score):
-    """保存最高分"""
-    try:
-        with open(HIGHSCORE_FILE, 'w') as f:
-            f.write(str(score))
-    except IOError as e:
-        print(f"警告: 无法将最高分保存到 {HIGHSCORE_FILE}: {e}。")
+    """保存最高分（交给后台线程，连续多次保存只写最后一次）"""
+    writer.replace(HIGHSCORE_FILE, write_atomic, HIGHSCORE_FILE, str(score))
 
 def load_leaderboard():
-    """加载排行榜"""
-    if os.path.exists(LEADERBOARD_FILE):
-        try:
-            with open(LEADERBOARD_FILE, 'r', encoding='utf-8') as f: # 指定utf-8编码
-                return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"警告: 无法从 {LEADERBOARD_FILE} 读取排行榜: {e}。创建新的排行榜。")
-            return []
-    else:
-        return []
-
-def save_leaderboard(leaderboard):
-    """保存排行榜"""
+    """打开排行榜数据库（首次运行时导入旧版 JSON 排行榜）"""
+    try:
+        return open_leaderboard(LEADERBOARD_DB, legacy_json=LEADERBOARD_FILE)
+    except sqlite3.Error as e:
+        print(f"警告: 无法打开排行榜 {LEADERBOARD_DB}: {e}。本次使用临时排行榜。")
+        return LeaderboardStore(':memory:')
+
+def save_replay(replay):
+    """把录像交给后台线程保存到录像目录，返回文件名"""
+    file_name = replay_file_name(replay)
+    path = os.path.join(REPLAY_DIR, file_name)
+    writer.replace(path, write_atomic, path, replay.encode())
+    return file_name
+
+def add_to_leaderboard(leaderboard, leaderboard_writer, name, score, replay_file=None):
+    """记录一条成绩；replay_file 为对应的录像文件名，用于事后校验"""
+    entry = (name, score, replay_file, time.time())
+    if leaderboard.path == ':memory:':
+        leaderboard.add_many([entry]) # 临时排行榜不涉及磁盘，直接写入
+        return
+    writer.append(LEADERBOARD_DB, entry, leaderboard_writer)
+
+def report_saves(game_state):
+    """处理后台写入完成的任务：排行榜和对局统计写入后刷新显示，出错时在屏幕上提示"""
+    for key, error in writer.poll():
+        if error is not None:
+            print(f"警告: 无法保存 {key}: {error}。")
+            game_state.notice = f'保存失败: {os.path.basename(key)}'
+            game_state.notice_until = time.perf_counter() + NOTICE_SECONDS
+        elif key == LEADERBOARD_DB and game_state.game_over:
+            refresh_leaderboard(game_state)
+        elif key == RUNSTATS_DIR and game_state.stats_lines is not None:
+            game_state.stats_lines = stats_lines() # 刚结束的一局写入后刷新统计界面
+
+def record_run(run_stats_writer, game_state, death_cause):
+    """把结束的一局追加到对局统计（后台写入，与其他局合并成一次追加）"""
+    record = run_record(game_state.score, game_state.tick, len(game_state.recorder.flaps), death_cause,
+                        game_state.recorder.seed)
+    writer.append(RUNSTATS_DIR, record, run_stats_writer)
+
+def stats_lines():
+    """统计界面要显示的文字行；还在后台写入的局在写完后由 report_saves 刷新"""
     try:
-        with open(LEADERBOARD_FILE, 'w', encoding='utf-8') as f: # 指定utf-8编码
-            json.dump(leaderboard, f, ensure_ascii=False, indent=4) # ensure_ascii=False 保存中文
-    except IOError as e:
-        print(f"警告: 无法将排行榜保存到 {LEADERBOARD_FILE}: {e}。")
-
-def add_to_leaderboard(leaderboard, name, score):
-    """添加分数到排行榜并排序截取"""
-    leaderboard.append({"name": name, "score": score})
-    leaderboard.sort(key=lambda x: x["score"], reverse=True)
-    return leaderboard[:MAX_LEADERBOARD_ENTRIES]
-
-# --- 游戏元素函数 ---
-
-def create_bird():
-    """创建小鸟状态字典"""
-    return {
-        'x': 100,
-        'y': SCREEN_HEIGHT // 2,
-        'velocity': 0,
-        'width': 30,
-        'height': 30
-    }
-
-def update_bird(bird):
-    """纯函数更新小鸟状态"""
-    new_velocity = bird['velocity'] + GRAVITY
-    new_y = bird['y'] + new_velocity
-
-    # 防止飞出顶部
-    if new_y < 0:
-        new_y = 0
-        new_velocity = 0
-
-    # 不在这里处理落地，落地是碰撞/结束条件
-    return {**bird, 'velocity': new_velocity, 'y': new_y}
-
-def jump_bird(bird):
-    """小鸟跳跃的新状态"""
-    return {**bird, 'velocity': BIRD_JUMP}
-
-def draw_bird(bird):
-    """绘制小鸟（无副作用）"""
-    center_x = bird['x'] + bird['width'] // 2
-    center_y = bird['y'] + bird['height'] // 2
-    radius = bird['width'] // 2
-
-    # 绘制小鸟身体(圆形)
-    pygame.draw.circle(screen, BIRD_YELLOW, (center_x, center_y), radius)
-    # 绘制小鸟眼睛
-    eye_x = center_x + radius * 0.3
-    eye_y = center_y - radius * 0.3
-    pygame.draw.circle(screen, WHITE, (int(eye_x), int(eye_y)), 4)
-    pygame.draw.circle(screen, BLACK, (int(eye_x), int(eye_y)), 2)
-    # 绘制小鸟嘴巴(三角形)
-    beak_tip_x = center_x + radius + 10 # 嘴尖 x 坐标
-    beak_tip_y = center_y          # 嘴尖 y 坐标
-    beak_base_y1 = center_y - 5   # 嘴根部上 y
-    beak_base_y2 = center_y + 5   # 嘴根部下 y
-    beak_base_x = center_x + radius # 嘴根部 x
-    pygame.draw.polygon(screen, BEAK_ORANGE,
-                       [(beak_tip_x, beak_tip_y),
-                        (beak_base_x, beak_base_y1),
-                        (beak_base_x, beak_base_y2)])
-
-def get_bird_rect(bird):
-    """获取小鸟碰撞检测矩形"""
-    return pygame.Rect(bird['x'], bird['y'], bird['width'], bird['height'])
-
-def create_pipe():
-    """创建管道状态字典"""
-    # 随机化缺口中心的位置，确保管道至少有一定高度
-    min_center_y = PIPE_GAP // 2 + 50
-    max_center_y = SCREEN_HEIGHT - PIPE_GAP // 2 - 50
-    gap_center_y = random.randint(min_center_y, max_center_y)
-
-    top_pipe_height = gap_center_y - PIPE_GAP // 2
-    bottom_pipe_y = gap_center_y + PIPE_GAP // 2
-
-    return {
-        'x': SCREEN_WIDTH,
-        'width': 60,
-        'top_height': top_pipe_height, # 上管道的高度
-        'bottom_y': bottom_pipe_y,    # 下管道的顶部Y坐标
-        'passed': False
-    }
-
-def update_pipe(pipe):
-    """纯函数更新管道状态"""
-    return {**pipe, 'x': pipe['x'] - PIPE_SPEED}
-
-def draw_pipe(pipe):
-    """绘制管道（无副作用）"""
-    # 上管道主体
-    pygame.draw.rect(screen, PIPE_GREEN, (pipe['x'], 0, pipe['width'], pipe['top_height']))
-    # 上管道边缘装饰
-    pygame.draw.rect(screen, PIPE_BORDER_GREEN, (pipe['x'] - 2, pipe['top_height'] - 10, pipe['width'] + 4, 10)) # 稍微宽一点
-    pygame.draw.rect(screen, BLACK, (pipe['x'] - 2, pipe['top_height'] - 10, pipe['width'] + 4, 10), 1) # 黑色描边
-
-    # 下管道主体
-    bottom_pipe_height = SCREEN_HEIGHT - pipe['bottom_y']
-    pygame.draw.rect(screen, PIPE_GREEN, (pipe['x'], pipe['bottom_y'], pipe['width'], bottom_pipe_height))
-    # 下管道边缘装饰
-    pygame.draw.rect(screen, PIPE_BORDER_GREEN, (pipe['x'] - 2, pipe['bottom_y'], pipe['width'] + 4, 10)) # 稍微宽一点
-    pygame.draw.rect(screen, BLACK, (pipe['x'] - 2, pipe['bottom_y'], pipe['width'] + 4, 10), 1) # 黑色描边
-
-def pipe_collide(pipe, bird):
-    """检测管道与小鸟碰撞"""
-    bird_rect = get_bird_rect(bird)
-    top_pipe_rect = pygame.Rect(pipe['x'], 0, pipe['width'], pipe['top_height'])
-    bottom_pipe_rect = pygame.Rect(pipe['x'], pipe['bottom_y'], pipe['width'], SCREEN_HEIGHT - pipe['bottom_y'])
-
-    return bird_rect.colliderect(top_pipe_rect) or bird_rect.colliderect(bottom_pipe_rect)
+        stats = RunStats(RUNSTATS_DIR) # 聚合需要 NumPy，此时才导入
+    except ImportError:
+        return ['查看统计需要安装 NumPy']
+    summary = stats.summary()
+    if summary['runs'] == 0:
+        return ['暂无对局记录']
+    lines = [
+        f"对局数: {summary['runs']}",
+        f"游戏时长: {summary['play_seconds'] / 3600:.1f} 小时",
+        f"平均得分: {summary['mean_score']:.1f}  最高分: {summary['max_score']}",
+        f"中位数: {summary['p50']}  前 10%: {summary['p90']}",
+        f"撞管 {summary['deaths']['pipe']}  落地 {summary['deaths']['ground']}",
+        '',
+    ]
+    for day, runs, best, _, _ in stats.per_day(STATS_DAYS):
+        lines.append(f"{day_name(day)[5:]}  {runs} 局  最高 {best}")
+    return lines
+
+def qualifies_for_leaderboard(leaderboard, score):
+    """分数能否进入总榜或今日榜的第一页（同分的旧成绩排在前面，与写入后的名次一致）"""
+    if score <= 0:
+        return False
+    return (leaderboard.rank(score - 1) <= MAX_LEADERBOARD_ENTRIES or
+            leaderboard.rank(score - 1, day=day_of(time.time())) <= MAX_LEADERBOARD_ENTRIES)
+
+def load_records(game_state):
+    """第一次需要时才读取最高分并打开排行榜，避免拖慢启动"""
+    if game_state.leaderboard is None:
+        game_state.highscore = load_highscore()
+        game_state.leaderboard = load_leaderboard()
+
+def refresh_leaderboard(game_state):
+    """按当前页码和榜单类型重新查询要显示的排行榜条目"""
+    leaderboard = game_state.leaderboard
+    day = day_of(time.time()) if game_state.leaderboard_today else None
+    pages = max(1, -(-leaderboard.count(day) // MAX_LEADERBOARD_ENTRIES))
+    game_state.leaderboard_page = max(0, min(game_state.leaderboard_page, pages - 1))
+    game_state.leaderboard_pages = pages
+    game_state.leaderboard_entries = leaderboard.top(
+        MAX_LEADERBOARD_ENTRIES, game_state.leaderboard_page * MAX_LEADERBOARD_ENTRIES, day=day)
+
+# --- 游戏状态 ---
+class GameState(World):
+    """窗口游戏的完整状态：逻辑世界（小鸟、管道、分数）加上界面相关的字段"""
+    __slots__ = ('game_active', 'game_over', 'highscore', 'leaderboard',
+                 'leaderboard_entries', 'leaderboard_page', 'leaderboard_pages', 'leaderboard_today',
+                 'player_name', 'input_active', 'name_entered',
+                 'course', 'recorder', 'replay_file', 'notice', 'notice_until', 'demo',
+                 'stats_lines')
+
+    def __init__(self, highscore, leaderboard, difficulty=DEFAULT_DIFFICULTY):
+        super().__init__() # 会在reset_game或首次开始时重置
+        self.game_active = False # 初始为非活动状态
+        self.game_over = False
+        self.highscore = highscore # 最高分和排行榜为 None 时由 load_records 在第一次需要时加载
+        self.leaderboard = leaderboard # 排行榜数据库 (LeaderboardStore)
+        self.leaderboard_entries = [] # 当前页要显示的条目
+        self.leaderboard_page = 0
+        self.leaderboard_pages = 1
+        self.leaderboard_today = False # True 时显示今日排行榜
+        self.player_name = ""
+        self.input_active = False # 是否处于名字输入状态
+        self.name_entered = False  # 名字是否已输入完成
+        self.course = Course(difficulty=difficulty) # 本局的赛道，每局用新的种子重新生成
+        self.recorder = None # 本局的录像记录器
+        self.replay_file = None # 本局录像保存后的文件名
+        self.notice = None # 屏幕底部的提示文字（例如保存失败）
+        self.notice_until = 0.0
+        self.demo = False # 演示模式：由自动驾驶操控，不记录成绩
+        self.stats_lines = None # 统计界面的文字，None 表示不显示
 
 # --- 游戏状态重置 ---
-def reset_game(game_state):
-    """重置游戏状态以开始新游戏"""
-    # 保留最高分和排行榜，重置其他状态
-    return {
-        **game_state, # 保留 highscore, leaderboard
-        'bird': create_bird(),
-        'pipes': [],
-        'score': 0,
-        'last_pipe': pygame.time.get_ticks() - PIPE_FREQUENCY + 500, # 稍微延迟第一次出管
-        'game_active': True,
-        'game_over': False,
-        'player_name': "", # 重置玩家名
-        'input_active': False,
-        'name_entered': False # 重置名字输入状态
-    }
+def reset_game(game_state, demo=False):
+    """重置游戏状态以开始新游戏；demo 为 True 时由自动驾驶操控"""
+    # 保留最高分和排行榜，原地重置小鸟、管道、分数和帧计数
+    reset_world(game_state)
+    # 每局使用新的种子，并从头开始录像
+    seed = new_seed()
+    game_state.course.reset(seed)
+    game_state.course.prefetch() # 开局时生成第一批管道，游戏中出管只是读取
+    game_state.recorder = ReplayRecorder(seed, game_state.course.difficulty)
+    game_state.replay_file = None
+    game_state.game_active = True
+    game_state.game_over = False
+    game_state.demo = demo
+    game_state.stats_lines = None
+    game_state.player_name = "" # 重置玩家名
+    game_state.input_active = False
+    game_state.name_entered = False # 重置名字输入状态
+    return game_state
 
 # --- 主游戏函数 ---
-def main():
-    # 初始化游戏状态
-    game_state = {
-        'bird': create_bird(),
-        'pipes': [],
-        'score': 0,
-        'last_pipe': 0, # 会在reset_game或首次开始时设置
-        'game_active': False, # 初始为非活动状态
-        'game_over': False,
-        'highscore': load_highscore(),
-        'leaderboard': load_leaderboard(),
-        'player_name': "",
-        'input_active': False, # 是否处于名字输入状态
-        'name_entered': False  # 名字是否已输入完成
-    }
+def main(argv=None):
+    global writer
+    args = parse_args(argv)
+    startup = StartupTimer(STARTED_NS)
+    startup.mark('导入模块')
+    init_display(dirty_rects=args.dirty_rects, startup=startup, rescan_fonts=args.rescan_fonts)
+
+    # 初始化游戏状态（最高分和排行榜推迟到游戏结束时读取）
+    game_state = GameState(None, None, args.difficulty)
+
+    # 回放模式：由录像驱动游戏世界，不记录最高分和排行榜
+    player = None
+    if args.replay:
+        try:
+            player = ReplayPlayer(Replay.load(args.replay), world=game_state)
+        except (IOError, ReplayError) as e:
+            print(f"错误: 无法读取录像 {args.replay}: {e}")
+            pygame.quit()
+            sys.exit(1)
+        game_state.game_active = True
+
+    # 演示模式：自动驾驶在每个逻辑帧前决定是否跳跃，置换表在各局之间复用（第一次演示时创建）
+    autopilot = None
+    demo_restart_at = None
+    if args.demo and player is None:
+        game_state = reset_game(game_state, demo=True)
+
+    # 磁盘写入都在后台线程中进行，游戏循环只负责排队
+    writer = BackgroundWriter()
+    leaderboard_writer = LeaderboardWriter(LEADERBOARD_DB)
+    run_stats_writer = RunStatsWriter(RUNSTATS_DIR)
+    startup.mark('初始化状态')
+
+    # 逻辑按固定步长推进，渲染在两个逻辑帧之间插值
+    timestep = FixedTimestep(speed=args.speed)
+    prev_bird_y = game_state.bird.y # 上一逻辑帧的小鸟高度，用于插值
+    fast_forward = False
+    last_render = 0.0
+    was_active = False # 上一帧是否有进行中的对局，用于在开局时重置调度器
+
+    # 帧耗时分析：默认使用空实现，按 F3 或指定 --profile 时才开始记录
+    profiling = args.profile or args.profile_out
+    profiler = FrameProfiler(trace=bool(args.profile_out)) if profiling else NullProfiler()
+    overlay = ProfileOverlay()
+    overlay.visible = args.profile
 
     running = True
     while running:
+        profiler.frame()
         # --- 事件处理 ---
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False # 结束主循环
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                renderer.invalidate() # 窗口被遮挡后重新显示，需要整屏提交
             if event.type == pygame.KEYDOWN:
-                if game_state['input_active']:
+                if event.key == pygame.K_F3:
+                    # 性能浮层开关，第一次打开时才开始记录
+                    overlay.visible = not overlay.visible
+                    if overlay.visible and not profiler.enabled:
+                        profiler = FrameProfiler()
+                elif game_state.input_active:
                     # 处理玩家名称输入
                     if event.key == pygame.K_RETURN:
                         # 确认输入 (名字不能为空)
-                        if game_state['player_name'].strip(): # 去掉首尾空格后判断
-                            game_state['leaderboard'] = add_to_leaderboard(
-                                game_state['leaderboard'],
-                                game_state['player_name'].strip(), # 保存处理过的名字
-                                game_state['score']
+                        if game_state.player_name.strip(): # 去掉首尾空格后判断
+                            game_state.player_name = game_state.player_name.strip() # 保存处理过的名字
+                            # 翻到本局成绩所在的那一页（同分的旧成绩排在前面），写入完成后自动刷新
+                            rank = game_state.leaderboard.rank(game_state.score - 1)
+                            add_to_leaderboard(
+                                game_state.leaderboard,
+                                leaderboard_writer,
+                                game_state.player_name,
+                                game_state.score,
+                                game_state.replay_file
                             )
-                            save_leaderboard(game_state['leaderboard'])
-                            game_state['input_active'] = False
-                            game_state['name_entered'] = True # 标记名字已输入
+                            game_state.input_active = False
+                            game_state.name_entered = True # 标记名字已输入
+                            game_state.leaderboard_today = False
+                            game_state.leaderboard_page = (rank - 1) // MAX_LEADERBOARD_ENTRIES
+                            refresh_leaderboard(game_state)
                         else:
                             # 可以在这里加个提示，比如输入框闪烁或提示文字
                             print("名字不能为空！")
                     elif event.key == pygame.K_BACKSPACE:
-                        game_state['player_name'] = game_state['player_name'][:-1]
+                        game_state.player_name = game_state.player_name[:-1]
                     else:
                         # 限制名称长度为10个字符, 且是可打印字符
-                        if len(game_state['player_name']) < 10 and event.unicode.isprintable():
-                            game_state['player_name'] += event.unicode
+                        if len(game_state.player_name) < 10 and event.unicode.isprintable():
+                            game_state.player_name += event.unicode
                 # 非输入状态下的按键处理
+                elif event.key == pygame.K_f:
+                    # 快进：模拟加速，画面只偶尔刷新
+                    fast_forward = not fast_forward
+                    timestep.speed = args.speed * (FAST_FORWARD_SPEED if fast_forward else 1)
+                elif player is not None:
+                    # 回放模式下的按键：左右方向键跳转，空格在结束后重播
+                    if event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                        offset = REPLAY_SEEK_TICKS if event.key == pygame.K_RIGHT else -REPLAY_SEEK_TICKS
+                        player.seek(game_state.tick + offset)
+                    elif event.key == pygame.K_SPACE and player.finished:
+                        player.seek(0)
+                    else:
+                        continue
+                    game_state.game_active = not player.finished
+                    game_state.game_over = player.finished
+                    prev_bird_y = game_state.bird.y
+                    timestep.reset(time.perf_counter()) # 跳转时重新模拟的耗时不算作需要追赶的时间
+                elif game_state.demo:
+                    # 演示中按空格回到开始界面
+                    if event.key == pygame.K_SPACE:
+                        reset_world(game_state)
+                        game_state.game_active = False
+                        game_state.game_over = False
+                        game_state.demo = False
+                        demo_restart_at = None
+                elif game_state.game_over and event.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_TAB):
+                    # 排行榜翻页 (↑/↓)，Tab 在总榜和今日榜之间切换
+                    if event.key == pygame.K_TAB:
+                        game_state.leaderboard_today = not game_state.leaderboard_today
+                        game_state.leaderboard_page = 0
+                    else:
+                        game_state.leaderboard_page += 1 if event.key == pygame.K_DOWN else -1
+                    refresh_leaderboard(game_state)
+                elif event.key == pygame.K_s and not game_state.game_active:
+                    # 开始界面和游戏结束界面按 S 打开/关闭统计
+                    game_state.stats_lines = None if game_state.stats_lines is not None else stats_lines()
                 elif event.key == pygame.K_SPACE:
-                    if game_state['game_active']:
-                        game_state['bird'] = jump_bird(game_state['bird'])
-                    elif game_state['game_over']: # 游戏结束状态
-                        if not game_state['name_entered']: # 如果还没输入名字
+                    if game_state.game_active:
+                        jump_bird(game_state.bird)
+                        game_state.recorder.flap(game_state.tick)
+                    elif game_state.game_over: # 游戏结束状态
+                        if not game_state.name_entered: # 如果还没输入名字
                              # 检查是否需要输入名字（进入排行榜）
-                            should_enter_name = game_state['score'] > 0 and (
-                                len(game_state['leaderboard']) < MAX_LEADERBOARD_ENTRIES or
-                                game_state['score'] > (min(entry["score"] for entry in game_state['leaderboard']) if game_state['leaderboard'] else 0)
-                            )
+                            should_enter_name = qualifies_for_leaderboard(game_state.leaderboard, game_state.score)
                             if should_enter_name:
-                                game_state['input_active'] = True # 激活输入状态
-                                game_state['player_name'] = ""    # 清空名字
+                                game_state.input_active = True # 激活输入状态
+                                game_state.stats_lines = None
+                                game_state.player_name = ""    # 清空名字
                             else:
                                 # 不需要输入名字，直接重置游戏
                                 game_state = reset_game(game_state)
@@ -289,190 +440,287 @@ def main():
                              game_state = reset_game(game_state)
                     else: # 初始界面状态
                         game_state = reset_game(game_state) # 开始新游戏
-
-        # --- 游戏逻辑更新 ---
-        if game_state['game_active']:
-            # 更新小鸟
-            game_state['bird'] = update_bird(game_state['bird'])
-
-            # 检测小鸟是否落地 (碰撞)
-            if game_state['bird']['y'] + game_state['bird']['height'] >= SCREEN_HEIGHT:
-                game_state['game_active'] = False
-                game_state['game_over'] = True
-                # 更新最高分(如果需要)
-                if game_state['score'] > game_state['highscore']:
-                    game_state['highscore'] = game_state['score']
-                    save_highscore(game_state['highscore'])
-                # 不在此处检查是否进入排行榜，交给按空格后的逻辑
-
-            # 生成新管道
-            time_now = pygame.time.get_ticks()
-            if time_now - game_state['last_pipe'] > PIPE_FREQUENCY:
-                game_state['pipes'].append(create_pipe())
-                game_state['last_pipe'] = time_now
-
-            # 更新管道并处理碰撞和计分
-            updated_pipes = []
-            for pipe in game_state['pipes']:
-                # 管道碰撞检测
-                if pipe_collide(pipe, game_state['bird']):
-                    game_state['game_active'] = False
-                    game_state['game_over'] = True
+                elif event.key == pygame.K_a and not game_state.game_active and not game_state.game_over:
+                    game_state = reset_game(game_state, demo=True) # 开始界面按 A 进入演示
+
+        profiler.mark('events')
+
+        # --- 游戏逻辑更新 (固定步长，卡顿时有限追赶) ---
+        now = time.perf_counter()
+        if game_state.demo and game_state.game_over and now >= demo_restart_at:
+            game_state = reset_game(game_state, demo=True)
+            prev_bird_y = game_state.bird.y
+        if game_state.game_active and not was_active:
+            timestep.reset(now) # 新的一局从此刻开始计时，开局前积累的时间不用追赶
+        was_active = game_state.game_active
+        ticks = timestep.advance(now)
+        if game_state.game_active:
+            if game_state.demo and player is None:
+                if autopilot is None:
+                    from autopilot import Autopilot # 只在演示时导入，不拖慢启动
+                    autopilot = Autopilot()
+                autopilot.start_frame() # 本帧追赶的所有逻辑帧共用一份搜索时间预算
+            for _ in range(ticks):
+                prev_bird_y = game_state.bird.y
+                if player is not None:
+                    death_cause = player.step()
+                else:
+                    if game_state.demo:
+                        if autopilot.decide(game_state):
+                            jump_bird(game_state.bird)
+                    death_cause = update_world(game_state, game_state.course)
+                if death_cause is not None:
+                    game_state.game_active = False
+                    game_state.game_over = True
+                    if player is not None:
+                        break
+                    if game_state.demo:
+                        demo_restart_at = now + DEMO_RESTART_SECONDS # 演示的成绩不保存
+                        if game_state.highscore is None:
+                            game_state.highscore = load_highscore() # 演示结束界面只显示最高分，不查询排行榜
+                        break
+                    load_records(game_state)
+                    record_run(run_stats_writer, game_state, death_cause)
+                    # 保存本局录像，进入排行榜时会一并记录文件名
+                    if game_state.score > 0:
+                        replay = game_state.recorder.finish(game_state.tick, game_state.score)
+                        game_state.replay_file = save_replay(replay)
                     # 更新最高分(如果需要)
-                    if game_state['score'] > game_state['highscore']:
-                        game_state['highscore'] = game_state['score']
-                        save_highscore(game_state['highscore'])
-                    # 碰撞后不需要再更新这条管道的位置了，但还是要保留以绘制结束画面
-                    updated_pipes.append(pipe) # 保留当前状态的管道
-                    continue # 跳过该管道的后续处理
-
-                # 更新管道位置
-                updated_pipe = update_pipe(pipe)
-
-                # 计分逻辑
-                bird_center_x = game_state['bird']['x'] + game_state['bird']['width'] // 2
-                pipe_end_x = updated_pipe['x'] + updated_pipe['width']
-                if not updated_pipe['passed'] and bird_center_x > pipe_end_x:
-                    updated_pipe = {**updated_pipe, 'passed': True}
-                    game_state['score'] += 1
-
-                # 保留仍在屏幕内或刚出屏幕的管道
-                if updated_pipe['x'] > -updated_pipe['width']:
-                    updated_pipes.append(updated_pipe)
-
-            game_state['pipes'] = updated_pipes
-
+                    if game_state.score > game_state.highscore:
+                        game_state.highscore = game_state.score
+                        save_highscore(game_state.highscore)
+                    # 不在此处检查是否进入排行榜，交给按空格后的逻辑
+                    game_state.leaderboard_page = 0
+                    refresh_leaderboard(game_state)
+                    break
+
+        # 后台保存的结果：刷新排行榜或提示错误
+        report_saves(game_state)
+        profiler.mark('logic')
+
+        # 快进时跳过大部分画面的绘制，把时间留给模拟
+        if fast_forward and now - last_render < 1.0 / FAST_FORWARD_RENDER_FPS:
+            # 不绘制的帧也要让出 CPU，否则循环空转占满一个核心；每次唤醒推进积攒下来的多个逻辑帧
+            clock.tick(args.fps or TICK_RATE)
+            profiler.mark('wait')
+            continue
+        last_render = now
+
+        # 游戏进行中按插值比例绘制小鸟和管道；刚开局还没有上一帧时直接绘制当前状态
+        alpha = timestep.alpha if game_state.game_active and game_state.tick > 0 else 1.0
+        bird_y = prev_bird_y + (game_state.bird.y - prev_bird_y) * alpha
 
         # --- 绘制 ---
         # 绘制背景
         screen.fill(SKY_BLUE)
 
         # 绘制管道 (无论游戏是否激活都要画，除非是初始界面)
-        if game_state['game_active'] or game_state['game_over']:
-            for pipe in game_state['pipes']:
-                draw_pipe(pipe)
+        if game_state.game_active or game_state.game_over:
+            for pipe in game_state.pipes:
+                pipe_x = pipe.x + PIPE_SPEED * (1 - alpha)
+                renderer.mark(('pipe', pipe.top_height, pipe.bottom_y), sprites.blit_pipe(screen, pipe, pipe_x))
 
         # 绘制小鸟 (根据状态绘制)
-        if game_state['game_active'] or game_state['game_over']:
-             draw_bird(game_state['bird']) # 绘制游戏中的或结束时的小鸟
-        elif not game_state['game_active'] and not game_state['game_over']: # 初始界面
+        if game_state.game_active or game_state.game_over:
+             renderer.mark('bird', sprites.blit_bird(screen, game_state.bird, bird_y)) # 绘制游戏中的或结束时的小鸟
+        elif not game_state.game_active and not game_state.game_over: # 初始界面
              # 开始游戏动画小鸟
-             animated_y = SCREEN_HEIGHT // 2 + 20 * math.sin(pygame.time.get_ticks() * 0.005) # 幅度小一点
+             animated_y = SCREEN_HEIGHT // 2 + 20 * math.sin(now * 5) # 幅度小一点
              animated_bird_state = create_bird()
-             animated_bird_state['y'] = animated_y
-             draw_bird(animated_bird_state) # 只绘制这个动画鸟
+             animated_bird_state.y = animated_y
+             renderer.mark('bird', sprites.blit_bird(screen, animated_bird_state)) # 只绘制这个动画鸟
+
 
+        profiler.mark('draw')
 
         # 显示分数 (仅在游戏活动时显示在左上角)
-        if game_state['game_active']:
-            score_surf = font.render(f'{game_state["score"]}', True, WHITE)
-            score_rect = score_surf.get_rect(topleft=(20, 15))
-            # 绘制半透明背景
-            bg_rect = pygame.Rect(10, 10, score_rect.width + 20, score_rect.height + 10)
-            # 创建一个带alpha通道的surface来绘制半透明矩形
-            s = pygame.Surface((bg_rect.width, bg_rect.height), pygame.SRCALPHA)
-            s.fill(TEXT_BG_COLOR)
-            screen.blit(s, (bg_rect.left, bg_rect.top))
-            # 绘制分数文本
-            screen.blit(score_surf, score_rect)
+        if game_state.game_active:
+            # 半透明背景和分数文本已合成在缓存的面板里，分数不变时不会重新渲染
+            renderer.blit(screen, sprites.score_panel(font, game_state.score), (10, 10))
+
+        # 回放进度 (按秒显示，避免每帧重新渲染文字)
+        if player is not None:
+            progress = f'回放 {game_state.tick // TICK_RATE}s / {player.replay.end_tick // TICK_RATE}s'
+            progress_surf = text_cache.render(highscore_font, progress, WHITE)
+            renderer.blit(screen, progress_surf, progress_surf.get_rect(bottomleft=(10, SCREEN_HEIGHT - 10)))
 
 
+        if game_state.demo:
+            demo_surf = text_cache.render(highscore_font, '演示中 (空格键退出)', WHITE)
+            renderer.blit(screen, demo_surf, demo_surf.get_rect(bottomleft=(10, SCREEN_HEIGHT - 10)))
+
         # 游戏开始/结束提示
-        if not game_state['game_active']:
-            if game_state['game_over']:
-                if game_state['input_active']:
+        if not game_state.game_active:
+            if game_state.stats_lines is not None:
+                # --- 统计界面 (开始界面或游戏结束界面按 S 打开) ---
+                y_pos = SCREEN_HEIGHT // 2 - 180
+                stats_title_surf = text_cache.render(font, '统计', WHITE)
+                renderer.blit(screen, stats_title_surf, stats_title_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos)))
+                y_pos += 40
+                for line in game_state.stats_lines:
+                    if line:
+                        line_surf = text_cache.render(highscore_font, line, WHITE)
+                        renderer.blit(screen, line_surf, line_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos)))
+                    y_pos += 25
+                back_surf = text_cache.render(highscore_font, '按 S 返回', WHITE)
+                renderer.blit(screen, back_surf, back_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos + 20)))
+            elif game_state.game_over and player is not None:
+                # --- 回放结束界面 ---
+                over_surf = text_cache.render(font, f'回放结束 得分: {game_state.score}', WHITE)
+                renderer.blit(screen, over_surf, over_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 40)))
+                hint_surf = text_cache.render(highscore_font, '按空格键重播，←/→ 跳转', WHITE)
+                renderer.blit(screen, hint_surf, hint_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 10)))
+            elif game_state.game_over and game_state.demo:
+                # --- 演示结束界面：稍后自动重开，只能按空格返回开始界面 ---
+                y_pos = SCREEN_HEIGHT // 2 - 60
+                lines = [(font, '演示结束', WHITE),
+                         (highscore_font, f'得分: {game_state.score}  最高分: {game_state.highscore}', WHITE),
+                         (highscore_font, f'{max(1, math.ceil(demo_restart_at - now))} 秒后重新开始', WHITE),
+                         (highscore_font, '按空格键返回开始界面', WHITE)]
+                for line_font, text, color in lines:
+                    line_surf = text_cache.render(line_font, text, color)
+                    renderer.blit(screen, line_surf, line_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos)))
+                    y_pos += 35
+            elif game_state.game_over:
+                if game_state.input_active:
                     # --- 显示输入名字界面 ---
                     # 提示文本
-                    prompt_surf = font.render('进入排行榜! 输入名字:', True, WHITE)
+                    prompt_surf = text_cache.render(font, '进入排行榜! 输入名字:', WHITE)
                     prompt_rect = prompt_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 60))
-                    screen.blit(prompt_surf, prompt_rect)
+                    renderer.blit(screen, prompt_surf, prompt_rect)
 
                     # 输入框背景
                     input_box_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 - 20, 200, 40)
-                    pygame.draw.rect(screen, WHITE, input_box_rect, 2, border_radius=5) # 带圆角
+                    renderer.mark('input_box', pygame.draw.rect(screen, WHITE, input_box_rect, 2, border_radius=5)) # 带圆角
 
                     # 显示输入的文本
-                    name_surf = font.render(game_state['player_name'], True, WHITE)
+                    name_surf = text_cache.render(font, game_state.player_name, WHITE)
                     # 文本应该在输入框内左对齐，加一点边距
                     name_rect = name_surf.get_rect(midleft=(input_box_rect.left + 10, input_box_rect.centery))
-                    screen.blit(name_surf, name_rect)
+                    renderer.blit(screen, name_surf, name_rect)
 
                     # 光标效果 (可选，简单的闪烁下划线)
-                    if pygame.time.get_ticks() % 1000 < 500: # 每秒闪烁一次
-                        cursor_x = name_rect.right + (5 if game_state['player_name'] else 0) # 根据有无文字调整位置
+                    if now % 1 < 0.5: # 每秒闪烁一次
+                        cursor_x = name_rect.right + (5 if game_state.player_name else 0) # 根据有无文字调整位置
                         cursor_y = input_box_rect.bottom - 5
-                        pygame.draw.line(screen, WHITE, (cursor_x, input_box_rect.top + 5), (cursor_x, cursor_y), 2)
+                        cursor_rect = pygame.draw.line(screen, WHITE, (cursor_x, input_box_rect.top + 5), (cursor_x, cursor_y), 2)
+                        renderer.mark('cursor', cursor_rect)
 
 
                     # 确认提示
-                    enter_surf = highscore_font.render('按 Enter 确认', True, WHITE)
+                    enter_surf = text_cache.render(highscore_font, '按 Enter 确认', WHITE)
                     enter_rect = enter_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
-                    screen.blit(enter_surf, enter_rect)
+                    renderer.blit(screen, enter_surf, enter_rect)
 
                 else: # 非输入状态的游戏结束界面
                     # --- 显示游戏结束信息和排行榜 ---
                     y_pos = SCREEN_HEIGHT // 2 - 150 # 初始Y坐标
 
                     # 游戏结束文本
-                    over_surf = font.render('游戏结束!', True, RED) # 用红色更醒目
+                    over_surf = text_cache.render(font, '游戏结束!', RED) # 用红色更醒目
                     over_rect = over_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                    screen.blit(over_surf, over_rect)
+                    renderer.blit(screen, over_surf, over_rect)
                     y_pos += 40
 
                     # 分数文本
-                    score_surf = highscore_font.render(f'得分: {game_state["score"]}', True, WHITE)
+                    score_surf = text_cache.render(highscore_font, f'得分: {game_state.score}', WHITE)
                     score_rect = score_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                    screen.blit(score_surf, score_rect)
+                    renderer.blit(screen, score_surf, score_rect)
                     y_pos += 30
 
                     # 最高分文本
-                    hs_surf = highscore_font.render(f'最高分: {game_state["highscore"]}', True, WHITE)
+                    hs_surf = text_cache.render(highscore_font, f'最高分: {game_state.highscore}', WHITE)
                     hs_rect = hs_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                    screen.blit(hs_surf, hs_rect)
+                    renderer.blit(screen, hs_surf, hs_rect)
                     y_pos += 50 # 留出更多空间给排行榜
 
-                    # 显示排行榜标题
-                    lb_title_surf = font.render('排行榜', True, WHITE)
+                    # 显示排行榜标题和页码
+                    lb_title = '今日排行榜' if game_state.leaderboard_today else '排行榜'
+                    if game_state.leaderboard_pages > 1:
+                        lb_title += f' ({game_state.leaderboard_page + 1}/{game_state.leaderboard_pages})'
+                    lb_title_surf = text_cache.render(font, lb_title, WHITE)
                     lb_title_rect = lb_title_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                    screen.blit(lb_title_surf, lb_title_rect)
+                    renderer.blit(screen, lb_title_surf, lb_title_rect)
                     y_pos += 35
 
                     # 显示排行榜条目
-                    if game_state['leaderboard']:
-                        for i, entry in enumerate(game_state['leaderboard']):
-                            rank_surf = highscore_font.render(f"{i+1}. {entry['name']} : {entry['score']}", True, WHITE)
+                    if game_state.leaderboard_entries:
+                        first_rank = game_state.leaderboard_page * MAX_LEADERBOARD_ENTRIES + 1
+                        for i, entry in enumerate(game_state.leaderboard_entries, start=first_rank):
+                            rank_surf = text_cache.render(highscore_font, f"{i}. {entry['name']} : {entry['score']}", WHITE)
                             rank_rect = rank_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                            screen.blit(rank_surf, rank_rect)
+                            renderer.blit(screen, rank_surf, rank_rect)
                             y_pos += 25
                     else:
-                         no_lb_surf = highscore_font.render("暂无记录", True, WHITE)
+                         no_lb_surf = text_cache.render(highscore_font, "暂无记录", WHITE)
                          no_lb_rect = no_lb_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                         screen.blit(no_lb_surf, no_lb_rect)
+                         renderer.blit(screen, no_lb_surf, no_lb_rect)
                          y_pos += 25
 
 
                     # 重新开始提示 (根据是否需要输入名字调整位置)
                     y_pos = max(y_pos, SCREEN_HEIGHT // 2 + 120) # 确保提示在排行榜下方
-                    restart_surf = highscore_font.render('按空格键继续', True, WHITE)
+                    restart_surf = text_cache.render(highscore_font, '按空格键继续', WHITE)
                     restart_rect = restart_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos))
-                    screen.blit(restart_surf, restart_rect)
+                    renderer.blit(screen, restart_surf, restart_rect)
+                    page_hint_surf = text_cache.render(highscore_font, '↑/↓ 翻页  Tab 今日榜', WHITE)
+                    page_hint_rect = page_hint_surf.get_rect(center=(SCREEN_WIDTH // 2, y_pos + 25))
+                    renderer.blit(screen, page_hint_surf, page_hint_rect)
 
             else: # 初始开始界面
                 # 绘制游戏标题
-                title_surf = font.render('像素小鸟', True, WHITE)
+                title_surf = text_cache.render(font, '像素小鸟', WHITE)
                 title_rect = title_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 150))
-                screen.blit(title_surf, title_rect)
+                renderer.blit(screen, title_surf, title_rect)
 
                 # 绘制操作提示
-                start_surf = font.render('按空格键开始游戏', True, WHITE)
+                start_surf = text_cache.render(font, '按空格键开始游戏', WHITE)
                 start_rect = start_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
-                screen.blit(start_surf, start_rect)
-
-        # 更新显示
-        pygame.display.update()
-        clock.tick(60) # 控制帧率
-
-    # 退出 Pygame
+                renderer.blit(screen, start_surf, start_rect)
+                demo_hint_surf = text_cache.render(highscore_font, '按 A 观看演示', WHITE)
+                demo_hint_rect = demo_hint_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 140))
+                renderer.blit(screen, demo_hint_surf, demo_hint_rect)
+                stats_hint_surf = text_cache.render(highscore_font, '按 S 查看统计', WHITE)
+                stats_hint_rect = stats_hint_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 170))
+                renderer.blit(screen, stats_hint_surf, stats_hint_rect)
+
+        # 保存失败等提示
+        if game_state.notice and now < game_state.notice_until:
+            notice_surf = text_cache.render(highscore_font, game_state.notice, RED)
+            renderer.blit(screen, notice_surf, notice_surf.get_rect(midbottom=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 10)))
+
+        # 性能浮层
+        if overlay.visible:
+            overlay.draw(screen, renderer, profiler, now)
+        profiler.mark('text')
+
+        # 更新显示 (脏矩形模式下只提交变化的区域，画面不变时跳过)
+        renderer.present()
+        if game_state.game_active:
+            game_state.course.top_up(game_state.pipe_index) # 画面提交后补充赛道，不占用逻辑帧
+        if startup is not None:
+            startup.mark('首帧')
+            if args.startup_report:
+                print("启动耗时:")
+                print(startup.report())
+            startup = None
+        profiler.mark('present')
+        clock.tick(0 if fast_forward else args.fps) # 控制渲染帧率
+        profiler.mark('wait')
+
+    # 退出前等待后台线程写完所有数据
+    writer.replace('close', leaderboard_writer.close) # 连接需在写入线程中关闭
+    writer.close()
+    for key, error in writer.poll():
+        if error is not None:
+            print(f"警告: 无法保存 {key}: {error}。")
+    if game_state.leaderboard is not None:
+        game_state.leaderboard.close()
+    if args.profile_out:
+        try:
+            profiler.export(args.profile_out)
+        except IOError as e:
+            print(f"警告: 无法导出性能数据到 {args.profile_out}: {e}。")
     pygame.quit()
     sys.exit()
 
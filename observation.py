@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""像素观测：直接读取渲染好的游戏画面，供基于图像的训练使用。
+
+- pygame.surfarray.pixels3d 返回 Surface 像素内存的视图，不复制整屏 400x600x3 的数据；
+- 降采样用步长切片（仍是视图），灰度用整数加权在预分配的缓冲区中计算，
+  每帧只读取降采样后用到的像素，只写出一份缩小后的观测；
+- 帧堆叠使用长度为 2*stack 的缓冲区，每帧写入两个位置，最近 stack 帧始终是一段连续切片，
+  返回的是视图，不需要 np.roll 或 np.stack；
+- SharedFrameRing 把观测放在 multiprocessing.shared_memory 中，多个渲染进程各自写入自己的
+  槽位，一个消费者按帧号读取视图。生产者可以让 ObservationPipeline 直接写入共享内存的槽位。
+
+命令行用法（无窗口，比较整屏复制与视图管线，并测量多进程共享内存的吞吐）::
+
+    python observation.py --frames 2000 --workers 2
+"""
+import os
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # 必须在导入 pygame 之前设置
+
+import argparse
+import json
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+from env import FlappyEnv
+from game_logic import SCREEN_WIDTH, SCREEN_HEIGHT
+from render import SurfaceCache, SpriteCache, draw_world
+from rollout import derive_seed, follow_gap_policy
+
+DOWNSAMPLE = 4   # 默认降采样倍数：600x400 -> 150x100
+FRAME_STACK = 4  # 默认堆叠的帧数
+GRAY_WEIGHTS = (77, 150, 29)  # ITU-R BT.601 亮度系数乘以 256，整数运算后右移 8 位
+RING_SLOTS = 8   # 共享内存中每个生产者的槽位数
+
+
+class ObservationPipeline:
+    """把游戏画面转换为降采样、可选灰度、可选堆叠的 uint8 观测"""
+
+    def __init__(self, downsample=DOWNSAMPLE, grayscale=True, stack=1,
+                 size=(SCREEN_WIDTH, SCREEN_HEIGHT)):
+        width, height = size
+        self.downsample = downsample
+        self.grayscale = grayscale
+        self.stack = stack
+        # 步长切片 [::n] 的长度是向上取整
+        self.frame_shape = (-(-height // downsample), -(-width // downsample))
+        if not grayscale:
+            self.frame_shape += (3,)
+        if grayscale:
+            self._acc = np.empty(self.frame_shape, dtype=np.uint16)
+            self._tmp = np.empty(self.frame_shape, dtype=np.uint16)
+        self._frames = np.empty((2 * stack,) + self.frame_shape, dtype=np.uint8)
+        self._index = 0
+        self._started = False
+
+    @property
+    def shape(self):
+        """observe() 返回的观测形状"""
+        return (self.stack,) + self.frame_shape if self.stack > 1 else self.frame_shape
+
+    def process(self, surface, out=None):
+        """把 surface 的当前画面转换为一帧观测写入 out（默认新建），返回 out"""
+        if out is None:
+            out = np.empty(self.frame_shape, dtype=np.uint8)
+        n = self.downsample
+        pixels = pygame.surfarray.pixels3d(surface)  # (宽, 高, 3) 视图，存在期间 surface 被锁定
+        try:
+            view = pixels[::n, ::n].transpose(1, 0, 2)  # (高, 宽, 3)，仍是视图
+            if self.grayscale:
+                acc, tmp = self._acc, self._tmp
+                r, g, b = GRAY_WEIGHTS
+                np.multiply(view[..., 0], np.uint16(r), out=acc)
+                np.multiply(view[..., 1], np.uint16(g), out=tmp)
+                acc += tmp
+                np.multiply(view[..., 2], np.uint16(b), out=tmp)
+                acc += tmp
+                np.right_shift(acc, 8, out=out, casting='unsafe')
+            else:
+                np.copyto(out, view)
+        finally:
+            del pixels  # 释放视图以解锁 surface，之后才能 blit 或提交显示
+        return out
+
+    def reset(self, surface):
+        """开始新的一局：用当前画面填满整个堆叠，返回观测"""
+        self._started = False
+        return self.observe(surface)
+
+    def observe(self, surface):
+        """处理一帧并返回最近 stack 帧（从旧到新），返回值是内部缓冲区的视图"""
+        if self.stack == 1:
+            return self.process(surface, out=self._frames[0])
+        frames = self._frames
+        stack = self.stack
+        if not self._started:
+            self.process(surface, out=frames[0])
+            frames[1:] = frames[0]
+            self._index = 0
+            self._started = True
+            return frames[1:1 + stack]
+        self._index = index = (self._index + 1) % stack
+        self.process(surface, out=frames[index])
+        frames[index + stack] = frames[index]  # 第二份副本，使最近 stack 帧保持连续
+        return frames[index + 1:index + 1 + stack]
+
+
+class SharedFrameRing:
+    """多个生产者、一个消费者的共享内存帧环
+
+    每个生产者拥有 slots 个槽位，按帧号循环写入。每个槽位记录其中的帧号，写入期间为 -1；
+    消费者读取视图前后各检查一次帧号，两次一致说明数据在读取期间没有被覆盖。
+    """
+
+    def __init__(self, frame_shape, producers=1, slots=RING_SLOTS, name=None):
+        """name 为 None 时新建共享内存（消费者），否则按名称连接已有的共享内存（生产者）"""
+        self.frame_shape = tuple(frame_shape)
+        self.producers = producers
+        self.slots = slots
+        header_size = producers * (slots + 1) * 8
+        frame_size = int(np.prod(self.frame_shape))
+        size = header_size + producers * slots * frame_size
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = name is None
+        # heads[p] 为生产者 p 最近提交的帧号，seqs[p, s] 为槽位中的帧号
+        header = np.ndarray((producers, slots + 1), dtype=np.int64, buffer=self.shm.buf)
+        self.heads = header[:, 0]
+        self.seqs = header[:, 1:]
+        self.frames = np.ndarray((producers, slots) + self.frame_shape, dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header_size)
+        if self.owner:
+            header[:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def slot(self, producer):
+        """生产者取得下一帧要写入的槽位视图，写完后调用 commit()"""
+        frame = self.heads[producer] + 1
+        index = frame % self.slots
+        self.seqs[producer, index] = -1
+        return self.frames[producer, index]
+
+    def commit(self, producer):
+        """提交 slot() 取得的槽位"""
+        frame = self.heads[producer] + 1
+        self.seqs[producer, frame % self.slots] = frame
+        self.heads[producer] = frame
+
+    def publish(self, producer, frame):
+        """复制一帧观测到下一个槽位并提交"""
+        np.copyto(self.slot(producer), frame)
+        self.commit(producer)
+
+    def latest(self, producer):
+        """消费者取得生产者最近提交的 (帧号, 视图)；还没有帧时返回 (-1, None)"""
+        frame = int(self.heads[producer])
+        if frame < 0:
+            return -1, None
+        return frame, self.frames[producer, frame % self.slots]
+
+    def read(self, producer, frame):
+        """取得指定帧的视图；已被覆盖或尚未写入时返回 None"""
+        if frame < 0 or self.seqs[producer, frame % self.slots] != frame:
+            return None
+        return self.frames[producer, frame % self.slots]
+
+    def valid(self, producer, frame):
+        """使用完 latest() 或 read() 返回的视图后调用，确认读取期间没有被覆盖"""
+        return self.seqs[producer, frame % self.slots] == frame
+
+    def close(self):
+        """断开共享内存；创建者同时释放它"""
+        # 先丢弃指向共享内存的数组，否则 close() 会因仍有导出的缓冲区而失败
+        self.heads = self.seqs = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# --- 渲染进程与命令行 ---
+
+def _init_headless():
+    """无窗口地初始化显示，返回 (画面, 精灵缓存)"""
+    # 在这里而不是导入时选择 dummy 驱动，只使用 ObservationPipeline 的模块不受影响
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    pygame.display.init()
+    surface = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    return surface, SpriteCache(SurfaceCache())
+
+
+def _play(surface, sprites, seed, frames):
+    """用跟随缺口策略玩游戏，每个逻辑帧绘制一次画面并产生一次"""
+    env = FlappyEnv()
+    state = env.reset(seed)
+    for _ in range(frames):
+        draw_world(surface, sprites, state)
+        yield
+        state, _, done = env.step(follow_gap_policy(state))
+        if done:
+            state = env.reset()
+
+
+def render_worker(ring_name, frame_shape, producers, producer, seed, frames, downsample, grayscale):
+    """渲染进程：玩 frames 帧，把每一帧的观测直接写入共享内存的槽位"""
+    surface, sprites = _init_headless()
+    ring = SharedFrameRing(frame_shape, producers, name=ring_name)
+    pipeline = ObservationPipeline(downsample, grayscale)
+    for _ in _play(surface, sprites, seed, frames):
+        pipeline.process(surface, out=ring.slot(producer))
+        ring.commit(producer)
+    ring.close()
+    pygame.quit()
+
+
+def _bench_single(frames, downsample, grayscale, stack):
+    """单进程：整屏复制后处理 与 视图管线 的每帧耗时（纳秒）"""
+    surface, sprites = _init_headless()
+    pipeline = ObservationPipeline(downsample, grayscale, stack)
+    results = {}
+
+    def copy_then_process(surface):
+        pixels = pygame.surfarray.array3d(surface)  # 复制整屏
+        view = pixels[::downsample, ::downsample].transpose(1, 0, 2)
+        if grayscale:
+            return (view @ np.array(GRAY_WEIGHTS, dtype=np.uint16) >> 8).astype(np.uint8)
+        return np.ascontiguousarray(view)
+
+    for name, func in (('array3d_copy', copy_then_process), ('pixels_view', pipeline.observe)):
+        start = time.perf_counter_ns()
+        for _ in _play(surface, sprites, 0, frames):
+            func(surface)
+        results[name] = (time.perf_counter_ns() - start) / frames
+
+    # 只绘制不取观测的耗时，用于从上面的结果中扣除
+    start = time.perf_counter_ns()
+    for _ in _play(surface, sprites, 0, frames):
+        pass
+    results['draw_only'] = (time.perf_counter_ns() - start) / frames
+    pygame.quit()
+    return results
+
+
+def _bench_shared(frames, workers, downsample, grayscale):
+    """多进程：workers 个渲染进程写入共享内存，消费者持续读取最新帧，返回每秒帧数"""
+    frame_shape = ObservationPipeline(downsample, grayscale).frame_shape
+    ring = SharedFrameRing(frame_shape, producers=workers)
+    context = multiprocessing.get_context('spawn')  # 子进程各自初始化 SDL
+    processes = [context.Process(target=render_worker,
+                                 args=(ring.name, frame_shape, workers, p, derive_seed(0, p), frames,
+                                       downsample, grayscale))
+                 for p in range(workers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    consumed = torn = 0
+    last = [-1] * workers
+    while any(process.is_alive() for process in processes) or any(
+            last[p] < ring.heads[p] for p in range(workers)):
+        for p in range(workers):
+            frame, view = ring.latest(p)
+            if frame > last[p]:
+                view.sum()  # 模拟消费者读取整帧
+                if ring.valid(p, frame):
+                    consumed += 1
+                    last[p] = frame
+                else:
+                    torn += 1
+        time.sleep(0.0005)
+    for process in processes:
+        process.join()
+    del view  # 关闭共享内存前不能保留指向它的视图
+    elapsed = time.perf_counter() - start
+    produced = sum(int(head) + 1 for head in ring.heads)
+    ring.close()
+    return {'produced_fps': produced / elapsed, 'consumed': consumed, 'torn_reads': torn,
+            'elapsed_seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="像素观测管线的性能测量")
+    parser.add_argument('--frames', type=int, default=2000, help="每项测量的帧数")
+    parser.add_argument('--workers', type=int, default=2, help="共享内存测量的渲染进程数，0 表示跳过")
+    parser.add_argument('--downsample', type=int, default=DOWNSAMPLE, help="降采样倍数")
+    parser.add_argument('--rgb', action='store_true', help="输出彩色观测而不是灰度")
+    parser.add_argument('--stack', type=int, default=FRAME_STACK, help="堆叠的帧数")
+    args = parser.parse_args()
+
+    grayscale = not args.rgb
+    pipeline = ObservationPipeline(args.downsample, grayscale, args.stack)
+    single = _bench_single(args.frames, args.downsample, grayscale, args.stack)
+    report = {
+        'observation_shape': pipeline.shape,
+        'observation_bytes': int(np.prod(pipeline.frame_shape)),
+        'screen_bytes': SCREEN_WIDTH * SCREEN_HEIGHT * 3,
+        'ns_per_frame': single,
+    }
+    if args.workers > 0:
+        report['shared_memory'] = _bench_shared(args.frames, args.workers, args.downsample, grayscale)
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""后台写入：把最高分、排行榜和录像的保存交给单独的线程，游戏循环只负责排队。
+
+- replace(key, func, *args)：同一 key 尚未写入的旧任务被新任务覆盖，
+  例如连续更新最高分时只写最后一次；
+- append(key, item, func)：同一 key 的条目累积起来，由 func(items) 一次写入，
+  例如几条排行榜成绩合并成一个事务；
+- poll()：在游戏循环中取回已完成的任务及其错误，不会阻塞；
+- close()：等待所有任务写完再结束线程，退出游戏前调用；
+  写入线程是守护线程，主循环因异常退出而没有调用 close() 时，由 atexit 写完剩余任务，
+  进程不会因为等待写入线程而挂住。
+
+文件统一用 write_atomic 先写临时文件再改名，写到一半崩溃也不会损坏原文件。
+"""
+import atexit
+import os
+import threading
+from collections import OrderedDict, deque
+
+COALESCE_DELAY = 0.05  # 收到任务后再等待的秒数，把同一时刻前后的多次保存合并
+
+
+def write_atomic(path, data):
+    """先写入同目录下的临时文件并落盘，再原子地替换目标文件"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class BackgroundWriter:
+    """单线程的后台写入队列"""
+
+    def __init__(self, delay=COALESCE_DELAY):
+        self.delay = delay
+        self._pending = OrderedDict()  # key -> (func, args)，按第一次提交的顺序执行
+        self._results = deque()        # 已完成的 (key, 异常或 None)
+        self._closing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='BackgroundWriter', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def replace(self, key, func, *args):
+        """提交任务；同一 key 尚未执行的旧任务被丢弃"""
+        with self._cond:
+            self._pending[key] = (func, args)
+            self._cond.notify()
+
+    def append(self, key, item, func):
+        """追加一个条目；同一 key 累积的条目由 func(items) 一次写入"""
+        with self._cond:
+            job = self._pending.get(key)
+            if job is None:
+                self._pending[key] = (func, ([item],))
+            else:
+                job[1][0].append(item)
+            self._cond.notify()
+
+    def poll(self):
+        """取回自上次调用以来完成的任务 [(key, 异常或 None), ...]，不会阻塞"""
+        results = []
+        while self._results:
+            results.append(self._results.popleft())
+        return results
+
+    def close(self):
+        """写完所有任务后结束写入线程；可重复调用"""
+        atexit.unregister(self.close)
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closing)
+                if not self._pending:
+                    return  # 正在关闭且没有剩余任务
+                if not self._closing and self.delay > 0:
+                    # 稍等片刻，让紧接着提交的任务合并到这一批
+                    self._cond.wait_for(lambda: self._closing, self.delay)
+                jobs, self._pending = self._pending, OrderedDict()
+            for key, (func, args) in jobs.items():
+                try:
+                    func(*args)
+                    self._results.append((key, None))
+                except Exception as e:
+                    self._results.append((key, e))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""帧耗时分析：用 perf_counter_ns 记录主循环每个阶段的耗时。
+
+主循环在每帧开始时调用 frame()，每个阶段结束时调用 mark(阶段名)，
+最近 PROFILE_WINDOW 帧保存在环形缓冲区中，用于计算 p50/p95/p99 等统计；
+需要离线分析时可以保留全部帧并导出为 CSV 或 JSON。
+
+未开启分析时使用 NullProfiler，它的方法什么也不做，每帧只多几次空函数调用。
+StartupTimer 记录启动过程中各步骤的耗时，用于分析从启动到第一帧的时间。
+"""
+import csv
+import json
+import unicodedata
+from collections import deque
+from time import perf_counter_ns
+
+PHASES = ('events', 'logic', 'draw', 'text', 'present', 'wait')  # 主循环的各个阶段
+PROFILE_WINDOW = 600  # 统计使用的最近帧数（60 FPS 下约 10 秒）
+
+
+def _display_width(text):
+    """终端中的显示宽度：中文等全角字符占两列"""
+    return sum(2 if unicodedata.east_asian_width(c) in 'WF' else 1 for c in text)
+
+
+def percentile(sorted_values, p):
+    """已排序序列的第 p 百分位数（最近秩）"""
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+class NullProfiler:
+    """关闭分析时使用的空实现"""
+    enabled = False
+    trace = None
+
+    def frame(self):
+        pass
+
+    def mark(self, phase):
+        pass
+
+    def summary(self):
+        return None
+
+
+class FrameProfiler:
+    """按阶段记录每帧耗时"""
+    enabled = True
+
+    def __init__(self, window=PROFILE_WINDOW, trace=False):
+        self._index = {phase: i for i, phase in enumerate(PHASES)}
+        self._current = [0] * len(PHASES)
+        self._frame_start = None
+        self._last = None
+        self.history = deque(maxlen=window)  # 每帧 (总耗时, 各阶段耗时...)，单位纳秒
+        self.trace = [] if trace else None   # 保留全部帧 (开始时间, 总耗时, 各阶段耗时...)
+
+    def frame(self):
+        """结束上一帧的记录并开始新的一帧"""
+        now = perf_counter_ns()
+        if self._frame_start is not None:
+            record = (now - self._frame_start, *self._current)
+            self.history.append(record)
+            if self.trace is not None:
+                self.trace.append((self._frame_start, *record))
+            self._current = [0] * len(PHASES)
+        self._frame_start = self._last = now
+
+    def mark(self, phase):
+        """把从上一次 mark（或帧开始）到现在的时间计入 phase"""
+        now = perf_counter_ns()
+        if self._last is not None:
+            self._current[self._index[phase]] += now - self._last
+        self._last = now
+
+    def summary(self):
+        """最近若干帧的统计，时间单位为毫秒；还没有完整的帧时返回 None"""
+        if not self.history:
+            return None
+        totals = sorted(record[0] for record in self.history)
+        count = len(totals)
+        mean = sum(totals) / count
+        phases = {}
+        for i, phase in enumerate(PHASES, start=1):
+            values = sorted(record[i] for record in self.history)
+            phases[phase] = {
+                'mean': sum(values) / count / 1e6,
+                'p95': percentile(values, 95) / 1e6,
+            }
+        return {
+            'frames': count,
+            'fps': 1e9 / mean if mean > 0 else 0.0,
+            'mean': mean / 1e6,
+            'p50': percentile(totals, 50) / 1e6,
+            'p95': percentile(totals, 95) / 1e6,
+            'p99': percentile(totals, 99) / 1e6,
+            'max': totals[-1] / 1e6,
+            'phases': phases,
+        }
+
+    def export(self, path):
+        """把保留的逐帧数据写入 path，扩展名为 .json 时写 JSON，否则写 CSV（单位纳秒）"""
+        if self.trace is None:
+            raise RuntimeError("创建 FrameProfiler 时没有开启 trace")
+        columns = ('frame', 'start_ns', 'total_ns') + tuple(f'{phase}_ns' for phase in PHASES)
+        rows = [(i, *record) for i, record in enumerate(self.trace)]
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'columns': columns, 'frames': rows, 'summary': self.summary()}, f)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                out = csv.writer(f)
+                out.writerow(columns)
+                out.writerows(rows)
+
+
+class StartupTimer:
+    """启动耗时分解：依次记录从 start 到各个步骤结束的时间"""
+
+    def __init__(self, start=None):
+        self.start = perf_counter_ns() if start is None else start
+        self._last = self.start
+        self.steps = []  # [(步骤名, 耗时纳秒), ...]
+
+    def mark(self, step):
+        """把从上一次 mark（或开始）到现在的时间计入 step"""
+        now = perf_counter_ns()
+        self.steps.append((step, now - self._last))
+        self._last = now
+
+    def report(self):
+        """返回多行文本形式的耗时分解，单位毫秒"""
+        rows = self.steps + [('合计', self._last - self.start)]
+        width = max(_display_width(step) for step, _ in rows)
+        return '\n'.join(f"{step}{' ' * (width - _display_width(step))} {elapsed / 1e6:8.1f} ms"
+                         for step, elapsed in rows)
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+"""绘制相关：颜色常量、小鸟/管道的绘制以及渲染缓存。
+
+小鸟、管道的主体和边缘、分数面板在第一次使用时烘焙成 Surface，
+文字按 (字体, 文本, 颜色) 缓存并按 LRU 淘汰，每一帧只需要少量 blit。
+可选的脏矩形模式只把画面中变化的区域提交给显示。
+性能浮层把帧耗时统计定期烘焙成一张面板。
+"""
+from collections import OrderedDict
+
+import pygame
+
+from game_logic import SCREEN_WIDTH, SCREEN_HEIGHT, PIPE_WIDTH, create_bird
+from profiler import PHASES
+
+# 颜色
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+SKY_BLUE = (100, 150, 255) # 定义背景色
+PIPE_GREEN = (0, 180, 0)
+PIPE_BORDER_GREEN = (0, 220, 0)
+BIRD_YELLOW = (255, 200, 0)
+BEAK_ORANGE = (255, 100, 0)
+TEXT_BG_COLOR = (0, 0, 0, 128) # 分数背景半透明黑
+
+TEXT_CACHE_SIZE = 256  # 文字缓存的最大条目数
+PIPE_CAP_HEIGHT = 10   # 管道边缘装饰的高度
+BEAK_LENGTH = 10       # 鸟嘴伸出身体的长度
+OVERLAY_REFRESH_SECONDS = 0.5  # 性能浮层的刷新间隔
+OVERLAY_FONT_SIZE = 18
+
+# --- 直接绘制（用于烘焙精灵） ---
+
+def draw_bird(surface, bird):
+    """在 surface 上绘制小鸟"""
+    center_x = bird.x + bird.width // 2
+    center_y = bird.y + bird.height // 2
+    radius = bird.width // 2
+
+    # 绘制小鸟身体(圆形)
+    pygame.draw.circle(surface, BIRD_YELLOW, (center_x, center_y), radius)
+    # 绘制小鸟眼睛
+    eye_x = center_x + radius * 0.3
+    eye_y = center_y - radius * 0.3
+    pygame.draw.circle(surface, WHITE, (int(eye_x), int(eye_y)), 4)
+    pygame.draw.circle(surface, BLACK, (int(eye_x), int(eye_y)), 2)
+    # 绘制小鸟嘴巴(三角形)
+    beak_tip_x = center_x + radius + BEAK_LENGTH # 嘴尖 x 坐标
+    beak_tip_y = center_y          # 嘴尖 y 坐标
+    beak_base_y1 = center_y - 5   # 嘴根部上 y
+    beak_base_y2 = center_y + 5   # 嘴根部下 y
+    beak_base_x = center_x + radius # 嘴根部 x
+    pygame.draw.polygon(surface, BEAK_ORANGE,
+                       [(beak_tip_x, beak_tip_y),
+                        (beak_base_x, beak_base_y1),
+                        (beak_base_x, beak_base_y2)])
+
+def draw_pipe_cap(surface, x, y, width):
+    """绘制管道边缘装饰（比管道稍宽，带黑色描边）"""
+    pygame.draw.rect(surface, PIPE_BORDER_GREEN, (x, y, width, PIPE_CAP_HEIGHT))
+    pygame.draw.rect(surface, BLACK, (x, y, width, PIPE_CAP_HEIGHT), 1) # 黑色描边
+
+# --- 渲染缓存 ---
+
+class SurfaceCache:
+    """按键缓存 Surface，超过容量时淘汰最久未使用的条目"""
+
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key, factory):
+        """返回 key 对应的 Surface，不存在时调用 factory() 创建"""
+        entries = self._entries
+        surf = entries.get(key)
+        if surf is None:
+            surf = factory()
+            entries[key] = surf
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        return surf
+
+    def render(self, font, text, color):
+        """带缓存的 font.render(text, True, color)"""
+        return self.get((font, text, color), lambda: font.render(text, True, color))
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SpriteCache:
+    """预先烘焙的小鸟、管道和分数面板；必须在 display.set_mode() 之后创建"""
+
+    def __init__(self, text_cache):
+        self.text_cache = text_cache
+
+        # 小鸟：身体、眼睛和嘴巴一起画到透明 Surface 上
+        bird = create_bird()
+        bird.x = bird.y = 0
+        self.bird = pygame.Surface((bird.width + BEAK_LENGTH, bird.height), pygame.SRCALPHA)
+        draw_bird(self.bird, bird)
+        self.bird = self.bird.convert_alpha()
+
+        # 管道主体：一整屏高的纯色条，按管道高度截取一部分绘制
+        self.pipe_body = pygame.Surface((PIPE_WIDTH, SCREEN_HEIGHT))
+        self.pipe_body.fill(PIPE_GREEN)
+        self.pipe_body = self.pipe_body.convert()
+
+        # 管道边缘装饰
+        self.pipe_cap = pygame.Surface((PIPE_WIDTH + 4, PIPE_CAP_HEIGHT))
+        draw_pipe_cap(self.pipe_cap, 0, 0, PIPE_WIDTH + 4)
+        self.pipe_cap = self.pipe_cap.convert()
+
+    def blit_bird(self, surface, bird, y=None):
+        """绘制小鸟，返回受影响的矩形；y 用于插值时覆盖小鸟的纵坐标"""
+        return surface.blit(self.bird, (bird.x, int(bird.y if y is None else y)))
+
+    def blit_pipe(self, surface, pipe, x=None):
+        """绘制上下两段管道，返回受影响的矩形；x 用于插值时覆盖管道的横坐标"""
+        x = pipe.x if x is None else int(x)
+        surface.blit(self.pipe_body, (x, 0), (0, 0, pipe.width, pipe.top_height))
+        surface.blit(self.pipe_cap, (x - 2, pipe.top_height - PIPE_CAP_HEIGHT))
+        surface.blit(self.pipe_body, (x, pipe.bottom_y), (0, 0, pipe.width, pipe.bottom_height))
+        surface.blit(self.pipe_cap, (x - 2, pipe.bottom_y))
+        return pygame.Rect(x - 2, 0, pipe.width + 4, SCREEN_HEIGHT)
+
+    def score_panel(self, font, score):
+        """分数面板：半透明背景加白色分数，按分数缓存"""
+        def bake():
+            text = self.text_cache.render(font, str(score), WHITE)
+            panel = pygame.Surface((text.get_width() + 20, text.get_height() + 10), pygame.SRCALPHA)
+            panel.fill(TEXT_BG_COLOR)
+            panel.blit(text, (10, 5))
+            return panel
+        return self.text_cache.get(('score_panel', font, score), bake)
+
+
+def draw_world(surface, sprites, world):
+    """绘制一帧不含文字的游戏画面：背景、管道和小鸟"""
+    surface.fill(SKY_BLUE)
+    for pipe in world.pipes:
+        sprites.blit_pipe(surface, pipe)
+    sprites.blit_bird(surface, world.bird)
+
+
+class DirtyRectRenderer:
+    """脏矩形提交：只把与上一帧不同的区域交给 display.update
+
+    每帧照常把画面完整绘制到 screen 上，同时用 mark() 记录每个绘制项
+    (内容标识, 矩形)。与上一帧相比新出现或消失的绘制项所覆盖的区域就是脏区域，
+    其余部分只可能是不变的背景。没有任何变化时跳过本帧的提交。
+    enabled 为 False 时每帧都整屏提交，与原来的行为一致。
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._previous = set()
+        self._current = set()
+        self._full_update = True
+
+    def invalidate(self):
+        """下一帧整屏提交（首帧、窗口重新显示等情况）"""
+        self._full_update = True
+
+    def mark(self, key, rect):
+        """记录一个绘制项；key 需能区分绘制内容，rect 为其覆盖的区域"""
+        if self.enabled:
+            self._current.add((key, tuple(rect)))
+
+    def blit(self, target, surf, dest, area=None):
+        """绘制 surf 并记录其区域，以 Surface 对象本身作为内容标识"""
+        rect = target.blit(surf, dest, area)
+        self.mark(surf if area is None else (surf, tuple(area)), rect)
+        return rect
+
+    def present(self):
+        """提交本帧，返回本帧是否更新了显示"""
+        if not self.enabled:
+            pygame.display.update()
+            return True
+        current, self._current = self._current, set()
+        changed = current ^ self._previous
+        self._previous = current
+        if self._full_update:
+            self._full_update = False
+            pygame.display.update()
+            return True
+        if not changed:
+            return False
+        pygame.display.update([rect for _, rect in changed])
+        return True
+
+
+class ProfileOverlay:
+    """性能浮层：每隔 OVERLAY_REFRESH_SECONDS 把 profiler.summary() 重新烘焙成半透明面板
+
+    使用 pygame 默认字体，只显示 ASCII 文本，不依赖中文字体。
+    """
+
+    def __init__(self):
+        self.visible = False
+        self.font = pygame.font.Font(None, OVERLAY_FONT_SIZE)
+        self._panel = None
+        self._next_refresh = 0.0
+
+    def _bake(self, summary):
+        if summary is None:
+            lines = ['profiling...']
+        else:
+            lines = [
+                f"FPS {summary['fps']:.0f}  ({summary['frames']} frames)",
+                f"frame ms p50 {summary['p50']:.2f}  p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f}",
+                "phase      mean    p95",
+            ]
+            for phase in PHASES:
+                stats = summary['phases'][phase]
+                lines.append(f"{phase:<9}{stats['mean']:6.2f} {stats['p95']:6.2f}")
+        texts = [self.font.render(line, True, WHITE) for line in lines]
+        line_height = self.font.get_linesize()
+        panel = pygame.Surface((max(t.get_width() for t in texts) + 10, line_height * len(texts) + 8),
+                               pygame.SRCALPHA)
+        panel.fill(TEXT_BG_COLOR)
+        for i, text in enumerate(texts):
+            panel.blit(text, (5, 4 + i * line_height))
+        return panel
+
+    def draw(self, surface, renderer, profiler, now):
+        """绘制浮层；now 为当前时间 (秒)，用于控制刷新频率"""
+        if self._panel is None or now >= self._next_refresh:
+            self._panel = self._bake(profiler.summary())
+            self._next_refresh = now + OVERLAY_REFRESH_SECONDS
+        return renderer.blit(surface, self._panel, (SCREEN_WIDTH - self._panel.get_width() - 5, 5))
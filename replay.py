@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""录像：记录管道随机种子和每次跳跃所在的逻辑帧，并能无界面地重新模拟校验。
+
+文件格式（小端）::
+
+    4 字节  魔数 b'FBR1'（默认难度）或 b'FBR2'（其他难度）
+    8 字节  随机种子
+    4 字节  结束帧（小鸟死亡时的 world.tick）
+    4 字节  声称的得分
+    varint + UTF-8  难度名（仅 FBR2）
+    varint  跳跃次数
+    varint  × N  跳跃帧号的差分（第一项为帧号本身）
+
+帧号 t 表示在世界从第 t 帧推进到第 t+1 帧之前跳跃。由于跳跃间隔通常只有
+几十帧，每次跳跃只占 1 个字节，一局录像一般只有几十个字节。
+
+命令行用法::
+
+    python replay.py verify replays/          # 批量校验目录下的所有录像
+    python replay.py info replays/xxx.fbr
+"""
+import argparse
+import os
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from course import CURVES, DEFAULT_DIFFICULTY, Course
+from game_logic import create_world, jump_bird, reset_world, update_world
+
+MAGIC = b'FBR1'
+MAGIC_DIFFICULTY = b'FBR2'  # 带难度名的录像
+_HEADER = struct.Struct('<4sQII')
+REPLAY_EXTENSION = '.fbr'
+REPLAY_DIR = "replays"  # 游戏中录像的保存目录
+MAX_REPLAY_TICKS = 10 ** 8  # 校验时允许的最大帧数，防止伪造的超长录像
+VERIFY_BATCH_SIZE = 4096  # 批量校验时每批同时模拟的录像数
+
+
+class ReplayError(ValueError):
+    """录像文件损坏或格式不正确"""
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("录像数据被截断")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """一局游戏的录像"""
+    __slots__ = ('seed', 'flaps', 'end_tick', 'score', 'difficulty')
+
+    def __init__(self, seed, flaps, end_tick, score, difficulty=DEFAULT_DIFFICULTY):
+        self.seed = seed
+        self.flaps = flaps        # 升序排列、互不重复的跳跃帧号
+        self.end_tick = end_tick
+        self.score = score
+        self.difficulty = difficulty  # 难度曲线名，见 course.CURVES
+
+    def encode(self):
+        """编码为字节串（默认难度仍写成 FBR1，旧版本也能读取）"""
+        if self.difficulty == DEFAULT_DIFFICULTY:
+            out = bytearray(_HEADER.pack(MAGIC, self.seed, self.end_tick, self.score))
+        else:
+            out = bytearray(_HEADER.pack(MAGIC_DIFFICULTY, self.seed, self.end_tick, self.score))
+            name = self.difficulty.encode('utf-8')
+            _write_varint(out, len(name))
+            out += name
+        _write_varint(out, len(self.flaps))
+        previous = 0
+        for tick in self.flaps:
+            _write_varint(out, tick - previous)
+            previous = tick
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data):
+        """从字节串解码"""
+        if len(data) < _HEADER.size:
+            raise ReplayError("录像数据被截断")
+        magic, seed, end_tick, score = _HEADER.unpack_from(data)
+        pos = _HEADER.size
+        difficulty = DEFAULT_DIFFICULTY
+        if magic == MAGIC_DIFFICULTY:
+            length, pos = _read_varint(data, pos)
+            if pos + length > len(data):
+                raise ReplayError("录像数据被截断")
+            difficulty = data[pos:pos + length].decode('utf-8', 'replace')
+            pos += length
+            if difficulty not in CURVES:
+                raise ReplayError(f"未知的难度: {difficulty}")
+        elif magic != MAGIC:
+            raise ReplayError("不是录像文件")
+        count, pos = _read_varint(data, pos)
+        flaps = []
+        tick = 0
+        for i in range(count):
+            delta, pos = _read_varint(data, pos)
+            if i > 0 and delta == 0:
+                raise ReplayError("跳跃帧号重复")
+            tick += delta
+            flaps.append(tick)
+        if pos != len(data):
+            raise ReplayError("录像末尾有多余数据")
+        return cls(seed, flaps, end_tick, score, difficulty)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.encode())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.decode(f.read())
+
+
+class ReplayRecorder:
+    """在游戏过程中记录跳跃帧号"""
+
+    def __init__(self, seed, difficulty=DEFAULT_DIFFICULTY):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.flaps = []
+
+    def flap(self, tick):
+        """记录在第 tick 帧之后的跳跃（同一帧多次跳跃只记一次）"""
+        if not self.flaps or self.flaps[-1] != tick:
+            self.flaps.append(tick)
+
+    def finish(self, end_tick, score):
+        return Replay(self.seed, list(self.flaps), end_tick, score, self.difficulty)
+
+
+def replay_file_name(replay):
+    """录像的默认文件名：保存时间加种子"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{replay.seed:016x}{REPLAY_EXTENSION}"
+
+
+def new_seed():
+    """为一局新游戏生成 64 位随机种子"""
+    return random.SystemRandom().getrandbits(64)
+
+
+def simulate(replay, max_ticks=MAX_REPLAY_TICKS):
+    """无界面重新模拟录像，返回 (得分, 死亡帧, 死亡原因)；超过 max_ticks 仍未死亡时原因为 None"""
+    world = create_world()
+    course = Course(replay.seed, replay.difficulty)
+    flaps = replay.flaps
+    next_flap = 0
+    cause = None
+    while cause is None and world.tick < max_ticks:
+        if next_flap < len(flaps) and flaps[next_flap] == world.tick:
+            jump_bird(world.bird)
+            next_flap += 1
+        cause = update_world(world, course)
+    return world.score, world.tick, cause
+
+
+def verify_replay(replay):
+    """校验单个录像，返回 (是否通过, 说明)"""
+    score, end_tick, cause = simulate(replay, max_ticks=replay.end_tick)
+    return _check_outcome(replay, score, end_tick if cause is not None else None)
+
+
+def _check_outcome(replay, score, end_tick):
+    """比较重新模拟的结果与录像声称的结果；end_tick 为 None 表示到结束帧仍存活"""
+    if replay.flaps and replay.flaps[-1] >= replay.end_tick:
+        return False, f"跳跃帧 {replay.flaps[-1]} 不早于结束帧 {replay.end_tick}"
+    if end_tick is None:
+        return False, f"第 {replay.end_tick} 帧时小鸟仍然存活"
+    if end_tick != replay.end_tick:
+        return False, f"小鸟在第 {end_tick} 帧死亡，录像声称第 {replay.end_tick} 帧"
+    if score != replay.score:
+        return False, f"实际得分 {score}，录像声称 {replay.score}"
+    return True, f"得分 {score}，共 {end_tick} 帧"
+
+
+def verify_many(replays):
+    """用向量化的 BatchFlappyEnv 同时重新模拟多个录像，返回 [(是否通过, 说明), ...]
+
+    难度相同、结束帧相近的录像分在同一批，每批只需模拟到批内最大的结束帧。
+    """
+    # 只有批量校验需要 NumPy，游戏保存录像时不必加载
+    import numpy as np
+    from batch_env import BatchFlappyEnv
+
+    results = [None] * len(replays)
+    batches = []
+    for difficulty in sorted({replay.difficulty for replay in replays}):
+        order = sorted((i for i in range(len(replays)) if replays[i].difficulty == difficulty),
+                       key=lambda i: replays[i].end_tick)
+        batches.extend((difficulty, order[start:start + VERIFY_BATCH_SIZE])
+                       for start in range(0, len(order), VERIFY_BATCH_SIZE))
+    for difficulty, batch in batches:
+        env = BatchFlappyEnv(len(batch), seeds=[replays[i].seed for i in batch], difficulty=difficulty)
+
+        # 把所有跳跃按帧号排序，模拟时顺序取出当前帧需要跳跃的世界
+        flap_ticks = np.concatenate([np.asarray(replays[i].flaps, dtype=np.int64) for i in batch])
+        flap_worlds = np.repeat(np.arange(len(batch)), [len(replays[i].flaps) for i in batch])
+        by_tick = np.argsort(flap_ticks, kind='stable')
+        flap_ticks, flap_worlds = flap_ticks[by_tick].tolist(), flap_worlds[by_tick]
+        last_tick = min(max(replays[i].end_tick for i in batch), MAX_REPLAY_TICKS)
+
+        death_tick = np.full(len(batch), -1, dtype=np.int64)
+        death_score = np.zeros(len(batch), dtype=np.int64)
+        flaps = np.zeros(len(batch), dtype=bool)
+        pos = 0
+        for tick in range(last_tick):
+            flaps[:] = False
+            end = pos
+            while end < len(flap_ticks) and flap_ticks[end] == tick:
+                end += 1
+            if end > pos:
+                flaps[flap_worlds[pos:end]] = True
+                pos = end
+            _, _, dones = env.step(flaps)
+            # 只记录每个世界第一次死亡，之后自动重置的对局不再关心
+            first = dones & (death_tick < 0)
+            if first.any():
+                death_tick[first] = tick + 1
+                death_score[first] = env.final_score[first]
+                if (death_tick >= 0).all():
+                    break
+
+        for j, i in enumerate(batch):
+            end_tick = int(death_tick[j]) if death_tick[j] >= 0 else None
+            results[i] = _check_outcome(replays[i], int(death_score[j]), end_tick)
+    return results
+
+
+def verify_file(path):
+    """校验单个录像文件，返回 (路径, 是否通过, 说明)"""
+    try:
+        replay = Replay.load(path)
+    except (OSError, ReplayError) as e:
+        return path, False, f"无法读取: {e}"
+    ok, message = verify_replay(replay)
+    return path, ok, message
+
+
+def _verify_chunk(files):
+    """读取一组录像文件并批量校验"""
+    results = []
+    replays, loaded = [], []
+    for path in files:
+        try:
+            replays.append(Replay.load(path))
+            loaded.append(path)
+        except (OSError, ReplayError) as e:
+            results.append((path, False, f"无法读取: {e}"))
+    for path, (ok, message) in zip(loaded, verify_many(replays)):
+        results.append((path, ok, message))
+    return results
+
+
+def _collect_paths(paths):
+    """展开命令行给出的文件和目录"""
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(REPLAY_EXTENSION):
+                    result.append(os.path.join(path, name))
+        else:
+            result.append(path)
+    return result
+
+
+def verify_paths(paths, workers=None):
+    """批量校验，返回 [(路径, 是否通过, 说明), ...]；多进程时每个进程各自批量模拟一部分录像"""
+    files = _collect_paths(paths)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(files) <= VERIFY_BATCH_SIZE:
+        return _verify_chunk(files)
+    chunk_size = -(-len(files) // workers)
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_results in pool.map(_verify_chunk, chunks):
+            results.extend(chunk_results)
+    return results
+
+
+class ReplayPlayer:
+    """在窗口中回放录像：按帧推进，支持跳转到任意帧"""
+
+    def __init__(self, replay, world=None):
+        self.replay = replay
+        self.world = world if world is not None else create_world()
+        self.course = Course(replay.seed, replay.difficulty)
+        self.seek(0)
+
+    def step(self):
+        """推进一帧，返回死亡原因（仍存活时为 None）"""
+        world = self.world
+        flaps = self.replay.flaps
+        if self._next_flap < len(flaps) and flaps[self._next_flap] == world.tick:
+            jump_bird(world.bird)
+            self._next_flap += 1
+        return update_world(world, self.course)
+
+    def seek(self, tick):
+        """从头重新模拟到第 tick 帧（不超过录像结束帧），返回实际到达的帧"""
+        tick = max(0, min(tick, self.replay.end_tick))
+        reset_world(self.world)
+        self.course.reset(self.replay.seed)
+        self._next_flap = 0
+        while self.world.tick < tick:
+            if self.step() is not None:
+                break
+        return self.world.tick
+
+    @property
+    def finished(self):
+        return self.world.tick >= self.replay.end_tick
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录像校验工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+    verify = sub.add_parser('verify', help="重新模拟并校验录像")
+    verify.add_argument('paths', nargs='+', help="录像文件或目录")
+    verify.add_argument('--workers', type=int, default=None, help="进程数，默认使用全部 CPU")
+    info = sub.add_parser('info', help="显示录像内容")
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        replay = Replay.load(args.path)
+        print(f"种子: {replay.seed}")
+        print(f"难度: {replay.difficulty}")
+        print(f"得分: {replay.score}")
+        print(f"结束帧: {replay.end_tick}")
+        print(f"跳跃次数: {len(replay.flaps)}")
+        print(f"文件大小: {os.path.getsize(args.path)} 字节")
+        return
+
+    start = time.perf_counter()
+    results = verify_paths(args.paths, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    failed = 0
+    for path, ok, message in results:
+        if not ok:
+            failed += 1
+            print(f"失败 {path}: {message}")
+    print(f"校验 {len(results)} 个录像，失败 {failed} 个，用时 {elapsed:.2f} 秒")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""多进程回合评估：把 M 局游戏分片到进程池中并汇总得分统计。
+
+每一局的种子都由主种子和回合序号推导出来，与进程数量及分片方式无关，
+因此同一个主种子下无论使用多少个进程，得到的统计结果都逐位一致。
+管道由种子和难度曲线确定的赛道按逻辑帧生成（见 course.py），不依赖真实时间。
+
+命令行用法::
+
+    python rollout.py --episodes 10000 --seed 0 --workers 8
+    python rollout.py --episodes 1000 --difficulty ramp
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from course import CURVES, DEFAULT_DIFFICULTY
+from env import FlappyEnv
+from profiler import percentile
+
+DEFAULT_MAX_TICKS = 100000  # 单局帧数上限，防止策略永远不死
+SHARD_SIZE = 64  # 每个任务包含的回合数，固定大小以保证结果与进程数无关
+
+
+def derive_seed(master_seed, episode_index):
+    """由主种子和回合序号推导出该局的随机数种子"""
+    digest = hashlib.sha256(f"{master_seed}:{episode_index}".encode('ascii')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def follow_gap_policy(state):
+    """简单的跟随缺口策略：小鸟低于下一个缺口的目标高度且正在下落时跳跃"""
+    bird = state.bird
+    target_y = 350
+    for pipe in state.pipes:
+        if pipe.x + pipe.width >= bird.x:
+            target_y = pipe.bottom_y - 45
+            break
+    return bird.velocity >= 0 and bird.y > target_y
+
+
+def run_episode(seed, policy=follow_gap_policy, max_ticks=DEFAULT_MAX_TICKS, difficulty=DEFAULT_DIFFICULTY):
+    """运行一局，返回 (得分, 帧数, 死亡原因)；达到帧数上限时死亡原因为 None"""
+    env = FlappyEnv(difficulty=difficulty)
+    state = env.reset(seed)
+    for _ in range(max_ticks):
+        state, _, done = env.step(policy(state))
+        if done:
+            break
+    return state.score, state.tick, env.death_cause
+
+
+def _run_shard(master_seed, start, stop, policy, max_ticks, difficulty):
+    """在工作进程中运行序号为 [start, stop) 的回合"""
+    return [run_episode(derive_seed(master_seed, i), policy, max_ticks, difficulty) for i in range(start, stop)]
+
+
+def summarize(results):
+    """把按回合顺序排列的 (得分, 帧数, 死亡原因) 列表汇总为统计字典"""
+    scores = sorted(score for score, _, _ in results)
+    count = len(scores)
+    if count == 0:
+        return {'episodes': 0}
+    mean = sum(scores) / count
+    variance = sum((s - mean) ** 2 for s in scores) / count
+
+    return {
+        'episodes': count,
+        'mean': mean,
+        'std': variance ** 0.5,
+        'min': scores[0],
+        'max': scores[-1],
+        'p50': percentile(scores, 50),
+        'p90': percentile(scores, 90),
+        'p99': percentile(scores, 99),
+        'total_ticks': sum(ticks for _, ticks, _ in results),
+        'histogram': dict(sorted(Counter(scores).items())),
+        'death_causes': dict(sorted(Counter(cause or 'max_ticks' for _, _, cause in results).items())),
+    }
+
+
+def run_rollouts(num_episodes, master_seed=0, policy=follow_gap_policy, workers=None,
+                 max_ticks=DEFAULT_MAX_TICKS, difficulty=DEFAULT_DIFFICULTY):
+    """并行运行 num_episodes 局并返回汇总统计；policy 必须是可 pickle 的模块级函数"""
+    shards = [(start, min(start + SHARD_SIZE, num_episodes))
+              for start in range(0, num_episodes, SHARD_SIZE)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    results = []
+    if workers <= 1:
+        for start, stop in shards:
+            results.extend(_run_shard(master_seed, start, stop, policy, max_ticks, difficulty))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_shard, master_seed, start, stop, policy, max_ticks, difficulty)
+                       for start, stop in shards]
+            # 按提交顺序收集结果，保证汇总与完成先后无关
+            for future in futures:
+                results.extend(future.result())
+    return summarize(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行评估策略的得分分布")
+    parser.add_argument('--episodes', type=int, default=1000, help="回合数")
+    parser.add_argument('--seed', type=int, default=0, help="主种子")
+    parser.add_argument('--workers', type=int, default=None, help="进程数，默认使用全部 CPU")
+    parser.add_argument('--max-ticks', type=int, default=DEFAULT_MAX_TICKS, help="单局帧数上限")
+    parser.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY, help="难度曲线")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = run_rollouts(args.episodes, args.seed, workers=args.workers, max_ticks=args.max_ticks,
+                         difficulty=args.difficulty)
+    elapsed = time.perf_counter() - start
+    stats['elapsed_seconds'] = elapsed
+    stats['ticks_per_second'] = stats.get('total_ticks', 0) / elapsed if elapsed > 0 else 0
+    print(json.dumps(stats, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""对局统计：每一局结束后追加到按列存储的文件中，用 NumPy memmap 读取并聚合。
+
+每一列是 RUNSTATS_DIR 目录下的一个定长二进制文件（小端），追加一局就是在每个文件末尾
+写入一个值。读取时把各列映射为 memmap，直方图、分位数和按天汇总都是对整列的向量运算，
+只读取需要的列，几百万局也只需要几毫秒到几十毫秒。
+
+写入到一半崩溃时各列长度可能不同，读取时以最短的一列为准，下次写入前截断多出的部分。
+游戏和服务器默认写同一个目录，修复和追加都在目录下锁文件的排他锁中进行，不会截掉另一个进程正在写的行。
+写入只用标准库，游戏进程不必为此加载 NumPy；读取和聚合时才导入。
+
+命令行用法::
+
+    python runstats.py report [--days 7] [--json]
+    python runstats.py bench --runs 1000000      # 生成模拟数据并测量聚合耗时
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import struct
+import tempfile
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+from game_logic import TICK_RATE, DEATH_GROUND, DEATH_PIPE
+
+RUNSTATS_DIR = "runstats"
+# 列名 -> struct 格式字符（小端，NumPy 中同名的 dtype 为 '<' + 格式字符）
+COLUMNS = {
+    'score': 'I',
+    'ticks': 'I',      # 本局的逻辑帧数
+    'flaps': 'I',      # 跳跃次数
+    'cause': 'B',      # 死亡原因，见 CAUSES
+    'seed': 'Q',       # 管道随机种子，可与录像对应
+    'timestamp': 'd',  # 结束时间 (Unix 时间戳)
+    'day': 'i',        # 结束时的本地日期，1970-01-01 为 0，用于按天汇总
+}
+CAUSES = (DEATH_GROUND, DEATH_PIPE)  # 死亡原因在 cause 列中的编码为下标
+LOCK_FILE = '.lock'  # 写入时持有排他锁的文件
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def local_day(timestamp):
+    """时间戳对应的本地日期编号（1970-01-01 为 0）"""
+    return datetime.date.fromtimestamp(timestamp).toordinal() - _EPOCH_ORDINAL
+
+
+def day_name(day):
+    """日期编号对应的 YYYY-MM-DD"""
+    return datetime.date.fromordinal(int(day) + _EPOCH_ORDINAL).isoformat()
+
+
+def _lock(f):
+    """阻塞直到取得 f 的排他锁"""
+    if os.name == 'nt':
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # 锁住第一个字节，LK_LOCK 重试约 10 秒后报错
+                return
+            except OSError:
+                pass
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(f):
+    if os.name == 'nt':
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def run_record(score, ticks, flaps, death_cause, seed, timestamp=None):
+    """一局的统计记录，供 RunStatsWriter 写入"""
+    if timestamp is None:
+        timestamp = time.time()
+    return (score, ticks, flaps, CAUSES.index(death_cause), seed, timestamp, local_day(timestamp))
+
+
+class RunStatsWriter:
+    """追加写入对局记录；可作为 BackgroundWriter.append 的写入函数"""
+
+    def __init__(self, path=RUNSTATS_DIR):
+        self.path = path
+
+    def __call__(self, records):
+        """追加 run_record() 生成的记录列表"""
+        if not records:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, LOCK_FILE), 'a+b') as lock:
+            _lock(lock)
+            try:
+                self._append(records)
+            finally:
+                _unlock(lock)
+
+    def _append(self, records):
+        # 上次写到一半崩溃时各列长度不同：先把每列截断到共同的行数，否则之后追加的行会错位
+        paths = {name: os.path.join(self.path, f'{name}.bin') for name in COLUMNS}
+        sizes = {name: os.path.getsize(path) if os.path.exists(path) else 0 for name, path in paths.items()}
+        rows = min(sizes[name] // struct.calcsize(code) for name, code in COLUMNS.items())
+        for name, code in COLUMNS.items():
+            if sizes[name] != rows * struct.calcsize(code):
+                os.truncate(paths[name], rows * struct.calcsize(code))
+        columns = list(zip(*records))
+        for (name, code), values in zip(COLUMNS.items(), columns):
+            with open(paths[name], 'ab') as f:
+                f.write(struct.pack(f'<{len(values)}{code}', *values))
+
+
+class RunStats:
+    """以 memmap 方式打开的对局统计"""
+
+    def __init__(self, path=RUNSTATS_DIR):
+        import numpy as np
+        self.path = path
+        sizes = {}
+        for name, code in COLUMNS.items():
+            file_path = os.path.join(path, f'{name}.bin')
+            sizes[name] = os.path.getsize(file_path) // struct.calcsize(code) if os.path.exists(file_path) else 0
+        self.count = min(sizes.values())
+        self.columns = {}
+        for name, code in COLUMNS.items():
+            dtype = np.dtype('<' + code)
+            if self.count == 0:
+                self.columns[name] = np.empty(0, dtype=dtype)
+            else:
+                self.columns[name] = np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype, mode='r',
+                                               shape=(self.count,))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def summary(self, day=None):
+        """全部对局（或某一天）的汇总；day 为日期编号"""
+        import numpy as np
+        score = self['score']
+        ticks = self['ticks']
+        flaps = self['flaps']
+        cause = self['cause']
+        if day is not None:
+            mask = self['day'] == day
+            score, ticks, flaps, cause = score[mask], ticks[mask], flaps[mask], cause[mask]
+        count = len(score)
+        if count == 0:
+            return {'runs': 0}
+        histogram = np.bincount(score)
+        cumulative = np.cumsum(histogram)
+
+        def percentile(p):
+            # 直方图的累计分布上取分位数，比对整列排序快得多
+            return int(np.searchsorted(cumulative, min(count - 1, int(p / 100 * count)), side='right'))
+
+        total_ticks = int(ticks.sum(dtype=np.uint64))
+        causes = np.bincount(cause, minlength=len(CAUSES))
+        return {
+            'runs': count,
+            'play_seconds': total_ticks / TICK_RATE,
+            'mean_score': float(score.mean(dtype=np.float64)),
+            'max_score': len(histogram) - 1,
+            'p50': percentile(50),
+            'p90': percentile(90),
+            'p99': percentile(99),
+            'mean_seconds': total_ticks / count / TICK_RATE,
+            'flaps_per_run': float(flaps.sum(dtype=np.uint64)) / count,
+            'deaths': {name: int(causes[i]) for i, name in enumerate(CAUSES)},
+            'histogram': histogram,
+        }
+
+    def per_day(self, days=None):
+        """按天汇总 [(日期编号, 局数, 最高分, 平均分, 游戏秒数), ...]；days 只保留最近若干天"""
+        import numpy as np
+        day = self['day']
+        score = self['score']
+        ticks = self['ticks']
+        if len(day) == 0:
+            return []
+        # 记录按结束时间追加，日期通常已经有序，每天是一段连续的区间；系统时间被调回时才需要排序
+        changes = np.diff(day)
+        if (changes < 0).any():
+            order = np.argsort(day, kind='stable')
+            day, score, ticks = day[order], score[order], ticks[order]
+            changes = np.diff(day)
+        starts = np.concatenate(([0], np.flatnonzero(changes) + 1))
+        runs = np.diff(np.append(starts, len(day)))
+        best = np.maximum.reduceat(score, starts)
+        scores = np.add.reduceat(score, starts, dtype=np.uint64)
+        seconds = np.add.reduceat(ticks, starts, dtype=np.uint64) / TICK_RATE
+        result = [(int(day[start]), int(runs[i]), int(best[i]), int(scores[i]) / int(runs[i]), float(seconds[i]))
+                  for i, start in enumerate(starts)]
+        return result[-days:] if days else result
+
+
+def _format_report(stats, days):
+    summary = stats.summary()
+    if summary['runs'] == 0:
+        return "暂无对局记录"
+    lines = [
+        f"对局数: {summary['runs']}    游戏时长: {summary['play_seconds'] / 3600:.1f} 小时",
+        f"平均得分: {summary['mean_score']:.2f}    最高分: {summary['max_score']}    "
+        f"p50/p90/p99: {summary['p50']}/{summary['p90']}/{summary['p99']}",
+        f"平均每局 {summary['mean_seconds']:.1f} 秒，跳跃 {summary['flaps_per_run']:.1f} 次",
+        "死亡原因: " + "  ".join(f"{name} {count}" for name, count in summary['deaths'].items()),
+        "",
+        "日期          局数   最高分   平均分   时长(分钟)",
+    ]
+    for day, runs, best, mean, seconds in stats.per_day(days):
+        lines.append(f"{day_name(day)}  {runs:>6} {best:>8} {mean:>8.2f} {seconds / 60:>12.1f}")
+    return "\n".join(lines)
+
+
+def _generate(path, runs, seed=0):
+    """写入 runs 局模拟数据（分数大致呈指数分布，时间分布在最近 30 天）"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    score = rng.exponential(20, runs).astype(np.uint32)
+    ticks = 150 + score * 90 + rng.integers(0, 90, runs)
+    now = time.time()
+    timestamps = now - rng.uniform(0, 30 * 86400, runs)
+    timestamps.sort()
+    columns = {
+        'score': score,
+        'ticks': ticks,
+        'flaps': ticks // 40,
+        'cause': rng.integers(0, len(CAUSES), runs),
+        'seed': rng.integers(0, 2 ** 63, runs),
+        'timestamp': timestamps,
+        'day': (timestamps + time.localtime(now).tm_gmtoff) // 86400,
+    }
+    os.makedirs(path, exist_ok=True)
+    for name, code in COLUMNS.items():
+        np.asarray(columns[name], dtype='<' + code).tofile(os.path.join(path, f'{name}.bin'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对局统计")
+    parser.add_argument('--dir', default=RUNSTATS_DIR, help="统计文件目录")
+    sub = parser.add_subparsers(dest='command', required=True)
+    report = sub.add_parser('report', help="打印汇总和最近几天的统计")
+    report.add_argument('--days', type=int, default=7, help="按天汇总显示的天数")
+    report.add_argument('--json', action='store_true', help="以 JSON 输出")
+    bench = sub.add_parser('bench', help="生成模拟数据并测量聚合耗时")
+    bench.add_argument('--runs', type=int, default=1000000)
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        stats = RunStats(args.dir)
+        if args.json:
+            summary = stats.summary()
+            summary.pop('histogram', None)
+            summary['per_day'] = [{'day': day_name(day), 'runs': runs, 'best': best, 'mean': mean,
+                                   'play_seconds': seconds}
+                                  for day, runs, best, mean, seconds in stats.per_day(args.days)]
+            print(json.dumps(summary, ensure_ascii=False, indent=4))
+        else:
+            print(_format_report(stats, args.days))
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            _generate(tmp, args.runs, seed=random.randrange(2 ** 32))
+            start = time.perf_counter()
+            stats = RunStats(tmp)
+            opened = time.perf_counter()
+            stats.summary()
+            summarized = time.perf_counter()
+            stats.per_day()
+            done = time.perf_counter()
+            print(f"{stats.count} 局: 打开 {(opened - start) * 1000:.1f} ms，汇总 {(summarized - opened) * 1000:.1f} ms，"
+                  f"按天汇总 {(done - summarized) * 1000:.1f} ms")
+            del stats  # 删除临时目录前释放 memmap
+
+
+if __name__ == "__main__":
+    main()
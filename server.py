@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+"""多会话游戏服务器：一个 asyncio 事件循环同时承载大量无界面对局。
+
+每个会话拥有自己的 World、赛道和录像记录器，规则与窗口游戏完全相同（game_logic）。
+一个调度协程按固定步长推进：每个逻辑帧先应用所有会话收到的跳跃，再依次推进全部会话，
+最后把状态消息写给各个客户端。客户端来不及接收时丢弃状态消息，不会拖慢调度。
+得分的对局与窗口游戏一样保存录像并写入排行榜，每一局都追加到对局统计（后台线程写入）。
+
+协议（小端、定长，第一个字节为消息类型）::
+
+    客户端 -> 服务器
+        J <名字长度 u8> <UTF-8 名字>   加入，服务器回复 W
+        S                              开始新的一局
+        F                              跳跃，在下一个逻辑帧生效
+        L                              离开
+    服务器 -> 客户端
+        W <会话号 u32>
+        G <种子 u64>                   新的一局开始
+        T <帧 u32> <y*4 i16> <速度*4 i16> <得分 u32> <下一根管道 x i16> <上管道高度 i16> <下管道顶部 i16>
+        O <帧 u32> <得分 u32> <死亡原因 u8> <总榜排名 u32>
+
+小鸟的高度和速度都是 1/4 的整数倍，乘以 4 后用 16 位整数可以精确表示。
+没有下一根管道时，管道 x 为 NO_PIPE_X。
+
+命令行用法::
+
+    python server.py serve --port 7777               # 监听 TCP
+    python server.py serve --unix /tmp/flappy.sock   # 监听 Unix 套接字
+    python server.py bench --sessions 300 --seconds 10   # 本地客户端压力测试
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import struct
+import time
+from collections import deque
+
+from course import CURVES, DEFAULT_DIFFICULTY, Course
+from game_logic import (
+    TICK_RATE, DEATH_PIPE, World, jump_bird, reset_world, update_world
+)
+from leaderboard import LEADERBOARD_DB, LeaderboardStore, LeaderboardWriter
+from persistence import BackgroundWriter, write_atomic
+from profiler import percentile
+from replay import REPLAY_DIR, ReplayRecorder, new_seed, replay_file_name
+from runstats import RUNSTATS_DIR, RunStatsWriter, run_record
+from timestep import FixedTimestep
+
+DEFAULT_PORT = 7777
+MAX_NAME_LENGTH = 10  # 与窗口游戏的名字长度限制相同
+MAX_BUFFERED_BYTES = 64 * 1024  # 客户端发送缓冲超过该值时丢弃状态消息
+METRICS_WINDOW = 10 * TICK_RATE  # 统计使用的最近逻辑帧数
+NO_PIPE_X = -32768
+
+WELCOME = struct.Struct('<cI')
+GAME_START = struct.Struct('<cQ')
+STATE = struct.Struct('<cIhhIhhh')
+GAME_OVER = struct.Struct('<cIIBI')
+# 服务器消息的长度，客户端按类型读取
+SERVER_MESSAGE_SIZES = {b'W': WELCOME.size, b'G': GAME_START.size, b'T': STATE.size, b'O': GAME_OVER.size}
+
+
+class Session:
+    """一个客户端连接及其对局"""
+    __slots__ = ('id', 'name', 'writer', 'world', 'course', 'recorder', 'active', 'flap', 'dropped')
+
+    def __init__(self, session_id, name, writer, difficulty=DEFAULT_DIFFICULTY):
+        self.id = session_id
+        self.name = name
+        self.writer = writer
+        self.world = World()
+        self.course = Course(difficulty=difficulty)
+        self.recorder = None
+        self.active = False  # 是否有正在进行的对局
+        self.flap = False    # 本帧是否收到跳跃
+        self.dropped = 0     # 因客户端接收太慢而丢弃的状态消息数
+
+
+class GameServer:
+    """持有全部会话并在一个调度协程中按帧推进"""
+
+    def __init__(self, leaderboard, writer=None, leaderboard_writer=None, save_replays=True,
+                 difficulty=DEFAULT_DIFFICULTY, run_stats_writer=None):
+        self.leaderboard = leaderboard  # 用于查询排名的 LeaderboardStore
+        self.writer = writer            # BackgroundWriter，为 None 时直接写入 leaderboard
+        self.leaderboard_writer = leaderboard_writer
+        self.run_stats_writer = run_stats_writer  # RunStatsWriter，为 None 时不记录对局统计
+        self.save_replays = save_replays and writer is not None
+        self.difficulty = difficulty    # 所有会话使用的难度曲线
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.ticks = 0
+        self.late_ticks = 0  # 因调度落后而在同一次唤醒中追赶的帧数
+        self.tick_times = deque(maxlen=METRICS_WINDOW)  # 每帧 (耗时纳秒, 活动会话数)
+
+    # --- 连接处理 ---
+
+    async def handle_client(self, reader, writer):
+        """一个客户端连接的生命周期：读取消息并修改对应会话的状态"""
+        session = None
+        try:
+            while True:
+                op = await reader.readexactly(1)
+                if op == b'J' and session is None:
+                    length = (await reader.readexactly(1))[0]
+                    name = (await reader.readexactly(length)).decode('utf-8', 'replace')
+                    name = name.strip()[:MAX_NAME_LENGTH] or '匿名'
+                    session = Session(next(self._ids), name, writer, self.difficulty)
+                    self.sessions[session.id] = session
+                    writer.write(WELCOME.pack(b'W', session.id))
+                elif session is None:
+                    break  # 加入之前只接受 J
+                elif op == b'F':
+                    session.flap = True
+                elif op == b'S':
+                    self.start_game(session)
+                elif op == b'L':
+                    break
+                else:
+                    break  # 未知消息，断开连接
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                self.sessions.pop(session.id, None)
+            writer.close()
+
+    def start_game(self, session):
+        """为会话开始新的一局"""
+        seed = new_seed()
+        reset_world(session.world)
+        session.course.reset(seed)
+        session.course.prefetch()  # 开局时生成第一批管道，不占用调度帧的时间
+        session.recorder = ReplayRecorder(seed, self.difficulty)
+        session.active = True
+        session.flap = False
+        session.writer.write(GAME_START.pack(b'G', seed))
+
+    # --- 调度 ---
+
+    def tick(self):
+        """推进所有进行中的对局一帧，并向客户端发送状态；某个会话出错时只断开该会话"""
+        start = time.perf_counter_ns()
+        active = 0
+        for session in list(self.sessions.values()):
+            if not session.active:
+                continue
+            active += 1
+            try:
+                self._step(session)
+            except Exception as e:
+                self.drop_session(session, e)
+        self.ticks += 1
+        self.tick_times.append((time.perf_counter_ns() - start, active))
+
+    def _step(self, session):
+        """推进一个会话一帧"""
+        world = session.world
+        if session.flap:
+            session.flap = False
+            jump_bird(world.bird)
+            session.recorder.flap(world.tick)
+        death_cause = update_world(world, session.course)
+        if death_cause is not None:
+            self.finish_game(session, death_cause)
+            return
+        writer = session.writer
+        if writer.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+            session.dropped += 1
+            return
+        bird = world.bird
+        pipe_x, top, bottom = NO_PIPE_X, 0, 0
+        for pipe in world.pipes:
+            if pipe.x + pipe.width >= bird.x:
+                pipe_x, top, bottom = pipe.x, pipe.top_height, pipe.bottom_y
+                break
+        writer.write(STATE.pack(b'T', world.tick, int(bird.y * 4), int(bird.velocity * 4), world.score,
+                                pipe_x, top, bottom))
+
+    def drop_session(self, session, error):
+        """记录错误并断开会话，其他会话照常推进"""
+        print(f"警告: 会话 {session.id} ({session.name}) 出错，已断开: {error!r}")
+        session.active = False
+        self.sessions.pop(session.id, None)
+        session.writer.close()  # handle_client 读到连接关闭后结束
+
+    def finish_game(self, session, death_cause):
+        """对局结束：保存录像、写入排行榜和对局统计并通知客户端"""
+        world = session.world
+        session.active = False
+        score = world.score
+        rank = self.leaderboard.rank(score)
+        if score > 0:
+            replay_file = None
+            if self.save_replays:
+                replay = session.recorder.finish(world.tick, score)
+                replay_file = replay_file_name(replay)
+                path = os.path.join(REPLAY_DIR, replay_file)
+                self.writer.replace(path, write_atomic, path, replay.encode())
+            entry = (session.name, score, replay_file, time.time())
+            if self.writer is None:
+                self.leaderboard.add_many([entry])
+            else:
+                self.writer.append(self.leaderboard_writer.path, entry, self.leaderboard_writer)
+        if self.run_stats_writer is not None:
+            record = run_record(score, world.tick, len(session.recorder.flaps), death_cause, session.recorder.seed)
+            if self.writer is None:
+                self.run_stats_writer([record])
+            else:
+                self.writer.append(self.run_stats_writer.path, record, self.run_stats_writer)
+        cause = 1 if death_cause == DEATH_PIPE else 0
+        session.writer.write(GAME_OVER.pack(b'O', world.tick, score, cause, rank))
+
+    async def run(self):
+        """调度协程：按固定步长推进，落后时有限追赶"""
+        loop = asyncio.get_running_loop()
+        timestep = FixedTimestep()
+        timestep.advance(loop.time())
+        while True:
+            ticks = timestep.advance(loop.time())
+            for _ in range(ticks):
+                self.tick()
+            if ticks > 1:
+                self.late_ticks += ticks - 1
+            for session in list(self.sessions.values()):
+                if session.active:
+                    try:
+                        session.course.top_up(session.world.pipe_index)  # 在两次调度之间补充赛道
+                    except Exception as e:
+                        self.drop_session(session, e)
+            if self.writer is not None:
+                for key, error in self.writer.poll():
+                    if error is not None:
+                        print(f"警告: 无法保存 {key}: {error}。")
+            await asyncio.sleep(max(0.0, timestep.tick_duration - timestep.accumulator))
+
+    def metrics(self):
+        """最近若干帧的调度统计，时间单位为毫秒"""
+        result = {
+            'sessions': len(self.sessions),
+            'active': sum(1 for session in self.sessions.values() if session.active),
+            'ticks': self.ticks,
+            'late_ticks': self.late_ticks,
+            'dropped_states': sum(session.dropped for session in self.sessions.values()),
+        }
+        if self.tick_times:
+            times = sorted(elapsed for elapsed, _ in self.tick_times)
+            total = sum(times)
+            session_ticks = sum(active for _, active in self.tick_times)
+            result['tick_ms'] = {
+                'mean': total / len(times) / 1e6,
+                'p50': percentile(times, 50) / 1e6,
+                'p95': percentile(times, 95) / 1e6,
+                'p99': percentile(times, 99) / 1e6,
+                'max': times[-1] / 1e6,
+            }
+            # 调度在单个线程中运行：每帧预算除以每个会话一帧的平均耗时，即单核可承载的会话数
+            if session_ticks:
+                per_session = total / session_ticks
+                result['sessions_per_core'] = int(1e9 / TICK_RATE / per_session)
+        return result
+
+
+# --- 命令行 ---
+
+async def _start_listening(server, host, port, unix_path):
+    if unix_path:
+        return await asyncio.start_unix_server(server.handle_client, path=unix_path)
+    return await asyncio.start_server(server.handle_client, host, port)
+
+
+async def _report(server, interval):
+    while True:
+        await asyncio.sleep(interval)
+        print(json.dumps(server.metrics(), ensure_ascii=False))
+
+
+async def serve(host, port, unix_path, leaderboard_path, report_interval, difficulty=DEFAULT_DIFFICULTY,
+                runstats_path=RUNSTATS_DIR):
+    """运行服务器直到被中断"""
+    leaderboard = LeaderboardStore(leaderboard_path)
+    writer = BackgroundWriter()
+    leaderboard_writer = LeaderboardWriter(leaderboard_path)
+    server = GameServer(leaderboard, writer, leaderboard_writer, difficulty=difficulty,
+                        run_stats_writer=RunStatsWriter(runstats_path))
+    listener = await _start_listening(server, host, port, unix_path)
+    print(f"监听 {unix_path or f'{host}:{port}'}")
+    tasks = [asyncio.ensure_future(server.run())]
+    if report_interval > 0:
+        tasks.append(asyncio.ensure_future(_report(server, report_interval)))
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.replace('close', leaderboard_writer.close)  # 连接需在写入线程中关闭
+        writer.close()
+        leaderboard.close()
+
+
+async def bot(host, port, unix_path, name, stats):
+    """本地测试客户端：按跟随缺口策略游戏，结束后立即开始下一局"""
+    if unix_path:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    encoded = name.encode('utf-8')
+    writer.write(b'J' + bytes([len(encoded)]) + encoded + b'S')
+    try:
+        while True:
+            op = await reader.readexactly(1)
+            data = op + await reader.readexactly(SERVER_MESSAGE_SIZES[op] - 1)
+            if op == b'T':
+                stats['states'] += 1
+                _, _, y, velocity, _, pipe_x, _, bottom = STATE.unpack(data)
+                target = (bottom - 45) * 4 if pipe_x != NO_PIPE_X else 350 * 4
+                if velocity >= 0 and y > target:
+                    writer.write(b'F')
+            elif op == b'O':
+                _, _, score, _, _ = GAME_OVER.unpack(data)
+                stats['games'] += 1
+                stats['score'] += score
+                writer.write(b'S')
+    finally:
+        writer.close()
+
+
+async def bench(sessions, seconds, host, port, unix_path, difficulty=DEFAULT_DIFFICULTY):
+    """在同一进程中启动服务器和 sessions 个本地客户端，运行 seconds 秒后返回统计"""
+    server = GameServer(LeaderboardStore(':memory:'), difficulty=difficulty)
+    listener = await _start_listening(server, host, port, unix_path)
+    scheduler = asyncio.ensure_future(server.run())
+    stats = {'states': 0, 'games': 0, 'score': 0}
+    bots = [asyncio.ensure_future(bot(host, port, unix_path, f'bot{i}', stats)) for i in range(sessions)]
+    await asyncio.sleep(seconds)
+    metrics = server.metrics()
+    for task in bots + [scheduler]:
+        task.cancel()
+    await asyncio.gather(*bots, scheduler, return_exceptions=True)
+    listener.close()
+    await listener.wait_closed()
+    server.leaderboard.close()
+    metrics['client'] = {
+        'states_per_second': stats['states'] / seconds,
+        'games': stats['games'],
+        'mean_score': stats['score'] / stats['games'] if stats['games'] else 0.0,
+    }
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话游戏服务器")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command in ('serve', 'bench'):
+        sub = subparsers.add_parser(command)
+        sub.add_argument('--host', default='127.0.0.1', help="TCP 监听地址")
+        sub.add_argument('--port', type=int, default=DEFAULT_PORT, help="TCP 端口")
+        sub.add_argument('--unix', metavar='PATH', help="改为监听 Unix 套接字")
+        sub.add_argument('--difficulty', choices=sorted(CURVES), default=DEFAULT_DIFFICULTY, help="难度曲线")
+    serve_parser = subparsers.choices['serve']
+    serve_parser.add_argument('--leaderboard', default=LEADERBOARD_DB, help="排行榜数据库")
+    serve_parser.add_argument('--runstats', default=RUNSTATS_DIR, help="对局统计目录")
+    serve_parser.add_argument('--report-interval', type=float, default=10.0,
+                              help="每隔多少秒打印一次调度统计，0 表示不打印")
+    bench_parser = subparsers.choices['bench']
+    bench_parser.add_argument('--sessions', type=int, default=300, help="本地客户端数")
+    bench_parser.add_argument('--seconds', type=float, default=10.0, help="运行秒数")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.leaderboard, args.report_interval,
+                              args.difficulty, args.runstats))
+        except KeyboardInterrupt:
+            pass
+    else:
+        metrics = asyncio.run(bench(args.sessions, args.seconds, args.host, args.port, args.unix,
+                                    args.difficulty))
+        print(json.dumps(metrics, ensure_ascii=False, indent=4))
+
+
+if __name__ == "__main__":
+    main()
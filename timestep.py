@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""固定步长调度：逻辑按恒定帧率推进，与渲染帧率解耦。
+
+每次渲染前调用 advance(now) 得到本次需要运行的逻辑帧数，
+alpha 给出当前时刻位于两个逻辑帧之间的比例，用于插值绘制。
+卡顿时追赶的帧数有上限，超出的时间直接丢弃，避免越追越慢。
+"""
+from game_logic import TICK_RATE
+
+MAX_CATCH_UP_TICKS = 5  # 一次最多追赶的逻辑帧数（按 1 倍速计）
+
+
+class FixedTimestep:
+    """固定步长调度器"""
+
+    def __init__(self, tick_rate=TICK_RATE, max_catch_up=MAX_CATCH_UP_TICKS, speed=1.0):
+        self.tick_duration = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up
+        self.speed = speed  # 模拟速度倍率，大于 1 时快于真实时间
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def reset(self, now=None):
+        """清空累计时间（例如开始新的一局时），避免把等待的时间当成需要追赶的帧"""
+        self.accumulator = 0.0
+        self.last_time = now
+
+    def advance(self, now):
+        """根据当前时间 (秒) 返回本次应运行的逻辑帧数"""
+        if self.last_time is None:
+            self.last_time = now
+            return 0
+        self.accumulator += (now - self.last_time) * self.speed
+        self.last_time = now
+
+        ticks = int(self.accumulator / self.tick_duration)
+        max_ticks = max(1, int(self.max_catch_up * max(1.0, self.speed)))
+        if ticks > max_ticks:
+            # 落后太多：只追赶 max_ticks 帧，其余时间丢弃
+            self.accumulator = 0.0
+            return max_ticks
+        self.accumulator -= ticks * self.tick_duration
+        return ticks
+
+    @property
+    def alpha(self):
+        """当前时刻在上一逻辑帧与下一逻辑帧之间的位置，范围 [0, 1]"""
+        return min(1.0, self.accumulator / self.tick_duration)